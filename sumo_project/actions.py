@@ -4,7 +4,8 @@ This module defines all possible actions on the simulation
 
 import traci
 
-from model import Area
+import backend
+from model import Area, create_sumo_logic
 
 
 def compute_edge_weight(edge_id):
@@ -57,13 +58,18 @@ def modifyLogic(logic, rf):
     :param rf: The reduction factor (must be positive)
     :return: A new Logic object with all phases modified
     """
-    new_phases = []
-    for phase in logic._phases:
-        new_phase = traci.trafficlight.Phase(phase.duration * rf, phase.minDuration * rf, phase.maxDuration * rf,
-                                             phase.phaseDef)
-        new_phases.append(new_phase)
+    new_phases = [phase.to_sumo(rf) for phase in logic._phases]
+    return create_sumo_logic("new-program", 0, new_phases)
 
-    return traci.trafficlight.Logic("new-program", 0, 0, 0, new_phases)
+
+def set_logic(tl_id, logic):
+    """
+    Set the program of a traffic light
+    :param tl_id: The traffic light ID
+    :param logic: The TraCI logic of the program
+    :return:
+    """
+    traci.trafficlight.setCompleteRedYellowGreenDefinition(tl_id, backend.convert_logic(traci, logic))
 
 
 def adjust_traffic_light_phase_duration(area, reduction_factor):
@@ -76,7 +82,7 @@ def adjust_traffic_light_phase_duration(area, reduction_factor):
     area.tls_adjusted = True
     for tl in area._tls:
         for logic in tl._logics:
-            traci.trafficlights.setCompleteRedYellowGreenDefinition(tl.tl_id, modifyLogic(logic, reduction_factor))
+            set_logic(tl.tl_id, modifyLogic(logic, reduction_factor))
 
 
 def count_vehicles_in_area(area):
@@ -123,7 +129,7 @@ def reverse_actions(area):
         area.tls_adjusted = False
         for tl in area._tls:
             for initial_logic in tl._logics:
-                traci.trafficlights.setCompleteRedYellowGreenDefinition(tl.tl_id, initial_logic._logic)
+                set_logic(tl.tl_id, initial_logic._logic)
 
     # Unlock the area
     if area.locked:
@@ -0,0 +1,81 @@
+"""
+This module selects the API used to control SUMO : TraCI, with SUMO running in another process
+and requests sent through a socket, or libsumo, with SUMO running into the simulation process
+"""
+
+import importlib
+import os
+import sys
+
+import traci as _traci
+
+"""
+Available backends
+"""
+BACKENDS = ('traci', 'libsumo')
+
+"""
+Modules of the project controlling SUMO, the runner being the main module when it is run as a script
+"""
+BACKEND_MODULES = ('actions', 'checkpoint', 'data', 'emissions', 'registry', 'runner', '__main__')
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_available(name):
+    """
+    :param name: The name of the backend
+    :return: True if the module of the backend can be imported
+    """
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        return False
+    return True
+
+
+def use_backend(name):
+    """
+    Bind the traci attribute of the modules of the project controlling SUMO to the module of the backend,
+    so that the same code controls SUMO through TraCI or libsumo. Must be called in the simulation process
+    before starting SUMO, libsumo running a single simulation by process.
+    The traffic lights programs of the dump remain TraCI objects, see convert_logic.
+    :param name: The name of the backend
+    :return: The module of the backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown backend {name}, available backends : {", ".join(BACKENDS)}')
+
+    backend = importlib.import_module(name)
+    for module_name in BACKEND_MODULES:
+        module = sys.modules.get(module_name)
+        module_file = getattr(module, '__file__', None)
+        if module_file is not None and os.path.dirname(os.path.abspath(module_file)) == PROJECT_DIR \
+                and hasattr(module, 'traci'):
+            module.traci = backend
+    return backend
+
+
+def convert_logic(backend, logic):
+    """
+    :param backend: The module of the backend
+    :param logic: A TraCI traffic light logic
+    :return: The logic in the type expected by the backend
+    """
+    if getattr(backend, '__name__', None) != 'libsumo':
+        return logic
+    phases = [backend.TraCIPhase(phase.duration, phase.state, phase.minDur, phase.maxDur) for phase in logic.phases]
+    return backend.TraCILogic(logic.programID, logic.type, logic.currentPhaseIndex, phases)
+
+
+def close(backend):
+    """
+    Close the connection to SUMO, without waiting for the end of the SUMO process with TraCI.
+    Nothing is done with TraCI if SUMO has not been started.
+    :param backend: The module of the backend
+    """
+    if backend is _traci:
+        if _traci.connection.has('default'):
+            _traci.close(False)
+    else:
+        backend.close()
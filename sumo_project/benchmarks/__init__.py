@@ -0,0 +1,3 @@
+"""
+This package benchmarks the controller code offline, against a fake TraCI backend instead of SUMO
+"""
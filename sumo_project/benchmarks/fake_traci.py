@@ -0,0 +1,292 @@
+"""
+This module defines a synthetic in-process stand-in for the traci module : a network of random lanes and
+traffic lights, and vehicles moving randomly over the map, so that the controller code can be run without SUMO
+"""
+
+import collections
+import contextlib
+import math
+
+import numpy as np
+from shapely.geometry import LineString
+from traci import constants as tc
+
+import actions
+import checkpoint
+import data
+import emissions
+import registry
+from model import Lane, Logic, Phase, TrafficLight, create_sumo_logic
+from netfile import Network
+
+"""
+Modules whose traci attribute is replaced by the fake backend
+"""
+PATCHED_MODULES = (actions, checkpoint, data, emissions, registry)
+
+
+def synthetic_network(n_lanes, n_tls, map_bounds=((0, 0), (10000, 10000)), seed=42):
+    """
+    Create a network of random straight lanes, the first lanes being controlled by the traffic lights
+    :param n_lanes: The number of lanes
+    :param n_tls: The number of traffic lights, each one controlling 4 lanes
+    :param map_bounds: The bounds of the network
+    :param seed: The seed of the random generator
+    :return: A new Network instance
+    """
+    rng = np.random.default_rng(seed)
+    (xmin, ymin), (xmax, ymax) = map_bounds
+    starts = rng.uniform((xmin, ymin), (xmax, ymax), size=(n_lanes, 2))
+    angles = rng.uniform(0, 2 * math.pi, size=n_lanes)
+    ends = starts + rng.uniform(20, 200, size=(n_lanes, 1)) * np.column_stack((np.cos(angles), np.sin(angles)))
+    ends = np.clip(ends, (xmin, ymin), (xmax, ymax))
+    lanes = [Lane(f'edge{index}_0', LineString([tuple(start), tuple(end)]), 13.9)
+             for index, (start, end) in enumerate(zip(starts.tolist(), ends.tolist()))]
+
+    phases = [Phase(30, 10, 40, 'GGrr'), Phase(3, 3, 3, 'yyrr'), Phase(30, 10, 40, 'rrGG'), Phase(3, 3, 3, 'rryy')]
+    tls = {}
+    lanes_tls = {}
+    for index in range(n_tls):
+        tl_id = f'tl{index}'
+        tls[tl_id] = TrafficLight(tl_id, [Logic(create_sumo_logic('0', 0, [phase.to_sumo() for phase in phases]),
+                                                phases)])
+        for lane in lanes[4 * index:4 * index + 4]:
+            lanes_tls[lane.lane_id] = [tl_id]
+    return Network(map_bounds, lanes, tls, lanes_tls)
+
+
+class FakeTraci:
+    """
+    The FakeTraci class answers the TraCI requests of the controller code.
+    At each step, vehicles move randomly with random emissions, and a share of them leave
+    the simulation and are replaced by new ones. Requests changing the simulation are only counted.
+    """
+
+    def __init__(self, network, n_vehicles, churn=0.01, seed=42):
+        """
+        FakeTraci constructor
+        :param network: The Network instance simulated
+        :param n_vehicles: The number of vehicles in the simulation
+        :param churn: The share of vehicles replaced at each step
+        :param seed: The seed of the random generator
+        """
+        self.network = network
+        self.churn = churn
+        self.rng = np.random.default_rng(seed)
+        (xmin, ymin), (xmax, ymax) = network.map_bounds
+        self.low, self.high = np.array((xmin, ymin), dtype=float), np.array((xmax, ymax), dtype=float)
+
+        self.ids = [f'veh{index}' for index in range(n_vehicles)]
+        self.indexes = {veh_id: index for index, veh_id in enumerate(self.ids)}
+        self.positions = self.rng.uniform(self.low, self.high, size=(n_vehicles, 2))
+        self.emissions = self._random_emissions(n_vehicles)
+        self._next_id = n_vehicles
+        self.departed = []
+        self.arrived = []
+        self._pending = list(self.ids)  # Vehicles departing at the first step
+        self.subscribed = set()
+        self.calls = collections.Counter()
+
+        self.simulation = _SimulationDomain(self)
+        self.vehicle = _VehicleDomain(self)
+        self.lane = _LaneDomain(self)
+        self.edge = _EdgeDomain(self)
+        self.trafficlight = _TrafficLightDomain(self)
+        self.polygon = _RecordingDomain(self, 'polygon')
+
+    def _random_emissions(self, n):
+        """
+        :param n: The number of vehicles
+        :return: Random CO2, CO, NOx, HC and PMx emissions (in mg) of n vehicles
+        """
+        return self.rng.gamma(2.0, (2000.0, 50.0, 2.0, 1.0, 0.1), size=(n, 5))
+
+    def simulationStep(self):
+        """
+        Move the vehicles and replace a share of them by new vehicles
+        """
+        n_vehicles = len(self.ids)
+        self.positions = np.clip(self.positions + self.rng.normal(0, 10, size=(n_vehicles, 2)), self.low, self.high)
+        self.emissions = self._random_emissions(n_vehicles)
+
+        self.arrived = []
+        if self._pending:  # First step
+            self.departed, self._pending = self._pending, []
+            return
+
+        self.departed = []
+        for index in self.rng.choice(n_vehicles, size=int(n_vehicles * self.churn), replace=False).tolist():
+            old_id, new_id = self.ids[index], f'veh{self._next_id}'
+            self._next_id += 1
+            self.arrived.append(old_id)
+            self.departed.append(new_id)
+            self.subscribed.discard(old_id)
+            del self.indexes[old_id]
+            self.ids[index] = new_id
+            self.indexes[new_id] = index
+            self.positions[index] = self.rng.uniform(self.low, self.high)
+
+
+class _RecordingDomain:
+    """
+    TraCI domain counting the requests made to it
+    """
+
+    def __init__(self, fake, name):
+        self._fake = fake
+        self._name = name
+
+    def __getattr__(self, method):
+        def record(*args):
+            self._fake.calls[f'{self._name}.{method}'] += 1
+        return record
+
+
+class _SimulationDomain(_RecordingDomain):
+    def __init__(self, fake):
+        super().__init__(fake, 'simulation')
+
+    def getDepartedIDList(self):
+        return tuple(self._fake.departed)
+
+    def getArrivedIDList(self):
+        return tuple(self._fake.arrived)
+
+
+"""
+Indexes of the emissions variables into the emissions array of the fake backend
+"""
+EMISSION_VARIABLES = {tc.VAR_CO2EMISSION: 0, tc.VAR_COEMISSION: 1, tc.VAR_NOXEMISSION: 2, tc.VAR_HCEMISSION: 3,
+                      tc.VAR_PMXEMISSION: 4}
+
+
+class _VehicleDomain(_RecordingDomain):
+    def __init__(self, fake):
+        super().__init__(fake, 'vehicle')
+
+    def getIDList(self):
+        return tuple(self._fake.ids)
+
+    def getPosition(self, veh_id):
+        x, y = self._fake.positions[self._fake.indexes[veh_id]].tolist()
+        return x, y
+
+    def _emission(self, veh_id, variable):
+        return float(self._fake.emissions[self._fake.indexes[veh_id], EMISSION_VARIABLES[variable]])
+
+    def getCO2Emission(self, veh_id):
+        return self._emission(veh_id, tc.VAR_CO2EMISSION)
+
+    def getCOEmission(self, veh_id):
+        return self._emission(veh_id, tc.VAR_COEMISSION)
+
+    def getNOxEmission(self, veh_id):
+        return self._emission(veh_id, tc.VAR_NOXEMISSION)
+
+    def getHCEmission(self, veh_id):
+        return self._emission(veh_id, tc.VAR_HCEMISSION)
+
+    def getPMxEmission(self, veh_id):
+        return self._emission(veh_id, tc.VAR_PMXEMISSION)
+
+    def getVehicleClass(self, veh_id):
+        return 'passenger'
+
+    def getEmissionClass(self, veh_id):
+        return 'HBEFA3/PC_G_EU4'
+
+    def subscribe(self, veh_id, variables):
+        self._fake.subscribed.add(veh_id)
+
+    def getAllSubscriptionResults(self):
+        fake = self._fake
+        positions = fake.positions.tolist()
+        vehicles_emissions = fake.emissions.tolist()
+        results = {}
+        for veh_id in fake.subscribed:
+            index = fake.indexes[veh_id]
+            results[veh_id] = {tc.VAR_POSITION: tuple(positions[index]),
+                               **{variable: vehicles_emissions[index][column]
+                                  for variable, column in EMISSION_VARIABLES.items()}}
+        return results
+
+
+class _LaneDomain(_RecordingDomain):
+    def __init__(self, fake):
+        super().__init__(fake, 'lane')
+        self._lanes = {lane.lane_id: lane for lane in fake.network.lanes}
+
+    def getIDList(self):
+        return tuple(self._lanes)
+
+    def getShape(self, lane_id):
+        return tuple(self._lanes[lane_id].polygon.coords)
+
+    def getMaxSpeed(self, lane_id):
+        return self._lanes[lane_id].initial_max_speed
+
+    def getEdgeID(self, lane_id):
+        return lane_id.rsplit('_', 1)[0]
+
+    def getLastStepVehicleNumber(self, lane_id):
+        return 1
+
+
+class _EdgeDomain(_RecordingDomain):
+    def __init__(self, fake):
+        super().__init__(fake, 'edge')
+
+    def getCO2Emission(self, edge_id):
+        return 2000.0
+
+    def getCOEmission(self, edge_id):
+        return 50.0
+
+    def getNOxEmission(self, edge_id):
+        return 2.0
+
+    def getHCEmission(self, edge_id):
+        return 1.0
+
+    def getPMxEmission(self, edge_id):
+        return 0.1
+
+
+class _TrafficLightDomain(_RecordingDomain):
+    def __init__(self, fake):
+        super().__init__(fake, 'trafficlight')
+        self._controlled_lanes = {}
+        for lane_id, tl_ids in fake.network.lanes_tls.items():
+            for tl_id in tl_ids:
+                self._controlled_lanes.setdefault(tl_id, []).append(lane_id)
+
+    def getIDList(self):
+        return tuple(self._fake.network.tls)
+
+    def getControlledLanes(self, tl_id):
+        return tuple(self._controlled_lanes.get(tl_id, ()))
+
+    def getCompleteRedYellowGreenDefinition(self, tl_id):
+        return tuple(logic._logic for logic in self._fake.network.tls[tl_id]._logics)
+
+    def getProgram(self, tl_id):
+        return '0'
+
+    def getPhase(self, tl_id):
+        return 0
+
+
+@contextlib.contextmanager
+def plug(fake):
+    """
+    Replace the traci module of the controller code by a fake backend
+    :param fake: The FakeTraci instance
+    """
+    originals = [module.traci for module in PATCHED_MODULES]
+    for module in PATCHED_MODULES:
+        module.traci = fake
+    try:
+        yield fake
+    finally:
+        for module, original in zip(PATCHED_MODULES, originals):
+            module.traci = original
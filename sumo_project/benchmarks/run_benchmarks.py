@@ -0,0 +1,328 @@
+"""
+This module runs the offline benchmark suite of the controller code against the fake TraCI backend,
+reports the throughput and the scaling of each function with the number of vehicles and areas,
+and fails if a function is slower than in a stored baseline :
+
+python -m benchmarks.run_benchmarks [-quick] [-baseline BASELINE] [-save_baseline BASELINE]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+import emissions
+import actions
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from control import ControlLag
+from data import Data
+from registry import VehicleRegistry
+from store import EmissionStore
+from window import create_window
+
+"""
+Default baseline, measured on the reference machine of the project
+"""
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+"""
+Sizes of the benchmarks : numbers of vehicles, numbers of areas in line and row, numbers of lanes
+"""
+SIZES = {'vehicles': (100, 1000, 10000), 'grid': (4, 10, 20), 'lanes': (1000, 10000)}
+QUICK_SIZES = {'vehicles': (100, 1000), 'grid': (4, 10), 'lanes': (1000,)}
+
+MAP_BOUNDS = ((0, 0), (10000, 10000))
+
+
+def measure(function, repeat=3):
+    """
+    :param function: The function benchmarked, without arguments
+    :param repeat: The number of measures
+    :return: The best time of a call in seconds, the number of calls of each measure being chosen
+    so that a measure lasts at least 0.2 second
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def measure_steps(step, function, steps=50):
+    """
+    :param step: The function running a step of the fake backend, not timed
+    :param function: The function benchmarked after each step, without arguments
+    :param steps: The number of steps
+    :return: The median time of a call in seconds
+    """
+    times = []
+    for _ in range(steps):
+        step()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def create_data(network, grid, simulation_dir):
+    """
+    :param network: The Network instance
+    :param grid: The number of areas in line and row
+    :param simulation_dir: The directory of the dumps
+    :return: A new Data instance, with the lanes and traffic lights of the network added to the areas
+    """
+    data = Data('benchmark', network.map_bounds, grid, simulation_dir)
+    data.init_grid()
+    data.add_net_data_to_areas(network)
+    return data
+
+
+def create_traci_data(map_bounds, grid, simulation_dir):
+    """
+    :param map_bounds: The bounds of the network
+    :param grid: The number of areas in line and row
+    :param simulation_dir: The directory of the dumps
+    :return: A new Data instance, with the lanes and traffic lights recovered with TraCI added to the areas
+    """
+    data = Data('benchmark', map_bounds, grid, simulation_dir)
+    data.init_grid()
+    data.add_data_to_areas()
+    return data
+
+
+def create_process(data, n_steps=1000, window_size=100):
+    """
+    Create the attributes of a RunProcess used by the controller code
+    :param data: The Data instance
+    :param n_steps: The number of steps of the store
+    :param window_size: The size of the acquisition window
+    :return: A stand-in for the current process
+    """
+    config = SimpleNamespace(window_type='sliding', window_size=window_size, pollutants_window_size=None,
+                             emissions_threshold=float('inf'), limit_speed_mode=True, speed_rf=0.1,
+                             adjust_traffic_light_mode=True, trafficLights_duration_rf=0.2,
+                             lock_area_mode=False, weight_routing_mode=False, control_period=1)
+    logger = logging.getLogger('benchmark')
+    logger.disabled = True
+    return SimpleNamespace(data=data, config=config, logger=logger,
+                           store=EmissionStore(n_steps, len(data.grid)),
+                           window=create_window(config, len(data.grid)), control_lag=ControlLag(len(data.grid)))
+
+
+def record(name, params, seconds, items, unit):
+    """
+    :return: The result of a benchmark, with its throughput in items per second
+    """
+    return {'name': name, 'params': params, 'time': seconds, 'throughput': items / seconds, 'unit': unit}
+
+
+def bench_vehicles(sizes, simulation_dir):
+    """
+    Benchmark the collection of the vehicles emissions, by polling (get_all_vehicles) and by the registry
+    with subscriptions, and the acquisition of the emissions of the areas (get_emissions), with the actions
+    of the areas over the threshold
+    """
+    results = []
+    network = synthetic_network(1000, 10, MAP_BOUNDS)
+    for grid in sizes['grid']:
+        data = create_data(network, grid, simulation_dir)
+        for n_vehicles in sizes['vehicles']:
+            params = {'vehicles': n_vehicles, 'grid': grid}
+            fake = FakeTraci(network, n_vehicles)
+            with plug(fake):
+                fake.simulationStep()
+                if grid == sizes['grid'][0]:
+                    seconds = measure(emissions.get_all_vehicles)
+                    results.append(record('get_all_vehicles', {'vehicles': n_vehicles}, seconds, n_vehicles,
+                                          'vehicles/s'))
+
+                # The departed and arrived vehicles change at each step
+                vehicle_registry = VehicleRegistry()
+                vehicle_registry.update()
+                seconds = measure_steps(fake.simulationStep,
+                                        lambda: (vehicle_registry.update(), vehicle_registry.sum_by_area(data)))
+                results.append(record('registry_update', params, seconds, n_vehicles, 'vehicles/s'))
+
+                # Half of the areas over the threshold once the window is full
+                p = create_process(data)
+                areas_emissions = vehicle_registry.sum_by_area(data)
+                p.config.emissions_threshold = np.median(areas_emissions.sum(axis=1)) * p.config.window_size
+                for _ in range(p.config.window_size):
+                    emissions.get_emissions(p, areas_emissions, 0)
+                seconds = measure(lambda: emissions.get_emissions(p, areas_emissions, 0))
+                results.append(record('get_emissions', params, seconds, len(data.grid), 'areas/s'))
+    return results
+
+
+def bench_data(sizes, simulation_dir):
+    """
+    Benchmark the recovery of the lanes and traffic lights with TraCI, their assignment to the areas,
+    and the saving of a dump
+    """
+    results = []
+    for n_lanes in sizes['lanes']:
+        network = synthetic_network(n_lanes, n_lanes // 100, MAP_BOUNDS)
+        for grid in sizes['grid']:
+            with plug(FakeTraci(network, 0)):
+                seconds = measure(lambda: create_traci_data(MAP_BOUNDS, grid, simulation_dir))
+            results.append(record('add_data_to_areas', {'lanes': n_lanes, 'grid': grid}, seconds, n_lanes,
+                                  'lanes/s'))
+
+        data = create_data(network, sizes['grid'][-1], simulation_dir)
+        seconds = measure(data.save)
+        results.append(record('data_save', {'lanes': n_lanes}, seconds, n_lanes, 'lanes/s'))
+    return results
+
+
+def bench_actions(sizes, simulation_dir):
+    """
+    Benchmark the actions applied to all the areas, and their reversal
+    """
+    results = []
+    n_lanes = max(sizes['lanes'])
+    network = synthetic_network(n_lanes, n_lanes // 100, MAP_BOUNDS)
+
+    def reverse_all(areas):
+        for area in areas:
+            area.limited_speed = area.tls_adjusted = area.locked = True
+            actions.reverse_actions(area)
+
+    benchmarks = {
+        'limit_speed_into_area': lambda area: actions.limit_speed_into_area(area, 0.1),
+        'adjust_traffic_light_phase_duration': lambda area: actions.adjust_traffic_light_phase_duration(area, 0.2),
+        'lock_area': actions.lock_area,
+        'count_vehicles_in_area': actions.count_vehicles_in_area,
+        'adjust_edges_weights': actions.adjust_edges_weights
+    }
+    for grid in sizes['grid']:
+        data = create_data(network, grid, simulation_dir)
+        params = {'lanes': n_lanes, 'grid': grid}
+        with plug(FakeTraci(network, min(sizes['vehicles']))) as fake:
+            fake.simulationStep()
+            for name, action in benchmarks.items():
+                seconds = measure(lambda: [action(area) for area in data.grid])
+                results.append(record(name, params, seconds, len(data.grid), 'areas/s'))
+            seconds = measure(lambda: reverse_all(data.grid))
+            results.append(record('reverse_actions', params, seconds, len(data.grid), 'areas/s'))
+    return results
+
+
+def run_benchmarks(sizes):
+    """
+    Run all the benchmarks
+    :param sizes: The sizes of the benchmarks, see SIZES
+    :return: The list of results
+    """
+    with tempfile.TemporaryDirectory() as simulation_dir:
+        return bench_vehicles(sizes, simulation_dir) + bench_data(sizes, simulation_dir) + \
+               bench_actions(sizes, simulation_dir)
+
+
+def result_key(result):
+    """
+    :return: The unique key of a result, e.g. get_emissions[vehicles=1000,grid=10]
+    """
+    params = ','.join(f'{name}={value}' for name, value in result['params'].items())
+    return f'{result["name"]}[{params}]'
+
+
+def print_results(results):
+    """
+    Print the time and throughput of each benchmark,
+    and the scaling curves of the benchmarks depending on the number of vehicles and on the grid size
+    """
+    width = max(len(result_key(result)) for result in results)
+    print(f'{"Benchmark":<{width}}  {"Time (ms)":>12}  {"Throughput":>24}')
+    for result in results:
+        throughput = f'{result["throughput"]:.0f} {result["unit"]}'
+        print(f'{result_key(result):<{width}}  {result["time"] * 1000:>12.4f}  {throughput:>24}')
+
+    for name in ('registry_update', 'get_emissions'):
+        curve = {(result['params']['vehicles'], result['params']['grid']): result['time']
+                 for result in results if result['name'] == name}
+        vehicles = sorted({n_vehicles for n_vehicles, _ in curve})
+        grids = sorted({grid for _, grid in curve})
+        print(f'\nScaling of {name} (ms per step), vehicles x grid')
+        print(f'{"vehicles":>10}' + ''.join(f'{f"{grid}x{grid}":>12}' for grid in grids))
+        for n_vehicles in vehicles:
+            print(f'{n_vehicles:>10}' + ''.join(f'{curve[n_vehicles, grid] * 1000:>12.4f}' for grid in grids))
+
+
+def check_regressions(results, baseline, tolerance):
+    """
+    Compare the results to a baseline
+    :param results: The list of results
+    :param baseline: The dictionary associating the key of a result with its time in the baseline
+    :param tolerance: The relative slowdown allowed, e.g. 1.0 for twice slower
+    :return: The list of (key, time, baseline time) of the benchmarks slower than the baseline
+    """
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        if key in baseline and result['time'] > baseline[key] * (1 + tolerance):
+            regressions.append((key, result['time'], baseline[key]))
+    return regressions
+
+
+def add_options(parser):
+    """
+    Add command line options
+    :param parser: The command line parser
+    :return:
+    """
+    parser.add_argument("-quick", "--quick", action="store_true",
+                        help='Run the benchmarks with the smallest sizes only')
+    parser.add_argument("-baseline", "--baseline", type=str, default=BASELINE_FILE,
+                        help='Baseline file the results are compared to (default: benchmarks/baseline.json)')
+    parser.add_argument("-tolerance", "--tolerance", type=float, default=1.0,
+                        help='Relative slowdown allowed against the baseline (default: 1.0, i.e. twice slower)')
+    parser.add_argument("-save_baseline", "--save_baseline", type=str,
+                        help='Save the results as a new baseline file')
+    parser.add_argument("-output", "--output", type=str,
+                        help='Save the results into a JSON file')
+
+
+def main(args):
+    """
+    The entry point of the benchmark suite
+    :param args: Command line options
+    :return: The exit status, 1 if a benchmark is slower than the baseline
+    """
+    parser = argparse.ArgumentParser()
+    add_options(parser)
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(QUICK_SIZES if args.quick else SIZES)
+    print_results(results)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'platform': platform.platform(), 'python': platform.python_version(), 'results': results},
+                      f, indent=4)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({result_key(result): result['time'] for result in results}, f, indent=4)
+        print(f'\nBaseline saved into {args.save_baseline}')
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(f'\nNo baseline file {args.baseline}')
+        return 0
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = check_regressions(results, baseline, args.tolerance)
+    for key, seconds, baseline_seconds in regressions:
+        print(f'Regression : {key} takes {seconds * 1000:.4f} ms against {baseline_seconds * 1000:.4f} ms')
+    print(f'\n{len(regressions)} regression(s) against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
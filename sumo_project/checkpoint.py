@@ -0,0 +1,181 @@
+"""
+This module saves checkpoints of a running simulation and resumes a simulation from its last checkpoint
+"""
+
+import json
+import os
+
+import numpy as np
+import traci
+
+import actions
+
+"""
+Action flags of the areas saved into a checkpoint
+"""
+AREA_FLAGS = ('limited_speed', 'locked', 'tls_adjusted', 'weight_adjusted')
+
+"""
+SUMO options needed to save states : random generators states, and positions and speeds
+with enough digits to be restored exactly
+"""
+SUMO_OPTIONS = ['--save-state.rng', '--save-state.precision', '25']
+
+
+def get_checkpoint_dir(p):
+    """
+    :param p: The current process
+    :return: The checkpoint directory of the simulation, which depends on the dump and the configuration file
+    """
+    conf_name = p.config.config_filename.replace('.json', '')
+    return os.path.join(p.data.dir, 'checkpoints', f'{p.data.dump_name}_{conf_name}')
+
+
+def _history_segments(p, checkpoint_dir):
+    """
+    :param p: The current process
+    :param checkpoint_dir: The checkpoint directory
+    :return: The list of (first step, last step + 1, file name) segments of the emissions history
+    already saved into the directory by the process
+    """
+    if getattr(p, 'checkpoint_segments', None) is None:
+        p.checkpoint_segments = {}
+    return p.checkpoint_segments.setdefault(checkpoint_dir, [])
+
+
+def get_tls_programs(p):
+    """
+    :param p: The current process
+    :return: A dictionary associating the ID of each traffic light with its current program ID and phase index
+    """
+    return {tl.tl_id: (traci.trafficlight.getProgram(tl.tl_id), traci.trafficlight.getPhase(tl.tl_id))
+            for tl in p.data.tls}
+
+
+def set_tls_programs(tls_programs):
+    """
+    Set back the traffic lights to their saved program and phase
+    :param tls_programs: The dictionary returned by get_tls_programs
+    :return:
+    """
+    for tl_id, (program_id, phase) in tls_programs.items():
+        traci.trafficlight.setProgram(tl_id, program_id)
+        traci.trafficlight.setPhase(tl_id, phase)
+
+
+def save_checkpoint(p, step, checkpoint_dir=None):
+    """
+    Save the SUMO state, the emissions history, the action flags of the areas and the vehicle classes breakdown.
+    The emissions history is saved by segments, each checkpoint only writing the steps since the previous one.
+    The checkpoint file is replaced at once, so that the last complete checkpoint is always kept.
+    :param p: The current process
+    :param step: The number of steps already simulated
+    :param checkpoint_dir: The checkpoint directory, by default the one of the simulation
+    :return: The path to the checkpoint file
+    """
+    checkpoint_dir = checkpoint_dir or get_checkpoint_dir(p)
+    if not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+
+    state_file = f'state_{step}.xml.gz'
+    traci.simulation.saveState(os.path.join(checkpoint_dir, state_file))
+
+    registry = getattr(p, 'registry', None)
+    class_names = registry.class_names if registry is not None else []
+    class_emissions = registry.class_emissions if registry is not None and registry.class_emissions is not None \
+        else np.zeros((len(p.data.grid), 0, 0))
+
+    segments = _history_segments(p, checkpoint_dir)
+    first_step = segments[-1][1] if segments else 0
+    segment_file = f'emissions_{first_step}_{step}.npy'
+    np.save(os.path.join(checkpoint_dir, segment_file), p.store.emissions[first_step:step])
+    segments.append((first_step, step, segment_file))
+
+    path = os.path.join(checkpoint_dir, 'checkpoint.npz')
+    tmp_path = os.path.join(checkpoint_dir, 'checkpoint.tmp.npz')
+    np.savez(tmp_path,
+             step=step,
+             state_file=state_file,
+             segments=json.dumps(segments),
+             flags=np.array([[getattr(area, flag) for flag in AREA_FLAGS] for area in p.data.grid], dtype=bool),
+             tls_programs=json.dumps(get_tls_programs(p)),
+             class_names=json.dumps(class_names),
+             class_emissions=class_emissions)
+    os.replace(tmp_path, path)
+
+    segment_files = {segment[2] for segment in segments}
+    for f in os.listdir(checkpoint_dir):  # Remove the states of the previous checkpoints and unused segments
+        if (f.startswith('state_') and f != state_file) or (f.startswith('emissions_') and f not in segment_files):
+            os.remove(os.path.join(checkpoint_dir, f))
+    return path
+
+
+def restore_checkpoint(p, checkpoint_dir=None):
+    """
+    Resume the simulation from its last checkpoint, if any.
+    Actions of the areas are applied again before loading the SUMO state, then each traffic light is set back
+    to its saved program at the saved phase, and the acquisition window and the export
+    are rebuilt by replaying the emissions history.
+    Note that SUMO does not restore all of its internal state (e.g. the insertion of the next vehicles
+    may differ), so the resumed simulation can slightly diverge from an uninterrupted one.
+    :param p: The current process, after the start of SUMO
+    :param checkpoint_dir: The checkpoint directory, by default the one of the simulation
+    :return: The number of steps already simulated, 0 if there is no checkpoint
+    """
+    checkpoint_dir = checkpoint_dir or get_checkpoint_dir(p)
+    path = os.path.join(checkpoint_dir, 'checkpoint.npz')
+    if not os.path.isfile(path):
+        return 0
+
+    with np.load(path) as checkpoint:
+        step = int(checkpoint['step'])
+        state_file = str(checkpoint['state_file'])
+        segments = [tuple(segment) for segment in json.loads(str(checkpoint['segments']))]
+        flags = checkpoint['flags']
+        tls_programs = json.loads(str(checkpoint['tls_programs'])) if 'tls_programs' in checkpoint else {}
+        class_names = json.loads(str(checkpoint['class_names']))
+        class_emissions = checkpoint['class_emissions']
+
+    history = [np.load(os.path.join(checkpoint_dir, segment_file)) for _, _, segment_file in segments]
+    # The next checkpoints into this directory continue the same segments
+    _history_segments(p, checkpoint_dir)[:] = segments
+
+    if p.config.adjust_traffic_light_mode:
+        # The adjusted programs must exist to be restored. A traffic light shared by several areas
+        # may be adjusted for a reversed area.
+        for tl in p.data.tls:
+            for logic in tl._logics:
+                actions.set_logic(tl.tl_id, actions.modifyLogic(logic, p.config.trafficLights_duration_rf))
+    for area, area_flags in zip(p.data.grid, flags):
+        area_flags = dict(zip(AREA_FLAGS, area_flags.tolist()))
+        area.tls_adjusted = area_flags['tls_adjusted']
+        if area_flags['limited_speed']:
+            actions.limit_speed_into_area(area, p.config.speed_rf)
+        if area_flags['locked']:
+            actions.lock_area(area)
+
+    traci.simulation.loadState(os.path.join(checkpoint_dir, state_file))
+    # Loading the state does not switch back the traffic lights from the adjusted programs defined above
+    set_tls_programs(tls_programs)
+
+    for area, weight_adjusted in zip(p.data.grid, flags[:, AREA_FLAGS.index('weight_adjusted')].tolist()):
+        if weight_adjusted:  # Edges efforts only, vehicles routes being restored with the state
+            area.weight_adjusted = True
+            for lane in area._lanes:
+                edge_id = traci.lane.getEdgeID(lane.lane_id)
+                traci.edge.setEffort(edge_id, actions.compute_edge_weight(edge_id))
+
+    registry = getattr(p, 'registry', None)
+    if registry is not None:
+        registry.class_names = class_names
+        registry.class_emissions = class_emissions if class_names else None
+        registry.register_all()
+
+    for history_step, areas_emissions in enumerate(np.concatenate(history) if history else []):
+        p.store.add_step(history_step, areas_emissions)
+        p.window.add(areas_emissions)
+        if p.exporter is not None:
+            p.exporter.add_step(history_step, areas_emissions)
+
+    p.logger.info(f'Simulation resumed from the checkpoint of the step {step} ({checkpoint_dir})')
+    return step
@@ -5,6 +5,7 @@ This module defines the global configuration for the simulation
 import json
 import os
 
+import backend
 from data import Data
 from model import Emission
 
@@ -14,6 +15,19 @@ class Config:
     The Config class defines all simulation properties that can be changed
     """
 
+    # Default values of the optional properties
+    subscription_mode = True
+    lane_aggregation_mode = False
+    store_mmap_mode = False
+    window_type = 'sliding'
+    pollutants_window_size = None
+    export_batch_size = 100
+    checkpoint_interval = None
+    seed = None
+    backend = 'traci'
+    control_period = 1
+    pipeline_mode = False
+
     def __init__(self,config_file, data : Data):
         """
         Default constructor
@@ -54,13 +68,28 @@ class Config:
             self.weight_routing_mode = False
             self.lock_area_mode = False
 
+        if not isinstance(self.control_period, int) or self.control_period < 1:
+            raise ValueError(f'The control period must be a positive number of steps, not {self.control_period}')
+
+        # libsumo runs SUMO without GUI, the GUI being run with TraCI
+        if self.backend == 'libsumo' and (self._SUMOCMD == 'sumo-gui' or not backend.is_available('libsumo')):
+            self.backend = 'traci'
+
     def __repr__(self) -> str:
         """
         :return: All properties chosen by the user
         """
         return (
             f'step number = {self.n_steps}\n'
-            f'window size = {self.window_size}\n'
+            f'subscription mode = {self.subscription_mode}\n'
+            f'lane aggregation mode = {self.lane_aggregation_mode}\n'
+            f'store mmap mode = {self.store_mmap_mode}\n'
+            f'checkpoint interval = {self.checkpoint_interval}\n'
+            f'seed = {self.seed}\n'
+            f'backend = {self.backend}\n'
+            f'control period = {self.control_period}\n'
+            f'pipeline mode = {self.pipeline_mode}\n'
+            f'window size = {self.window_size}, type = {self.window_type}\n'
             f'weight routing mode = {self.weight_routing_mode}\n'
             f'lock area mode = {self.lock_area_mode}\n'
             f'limit speed mode = {self.limit_speed_mode}, RF = {self.speed_rf * 100}%\n'
@@ -80,4 +109,6 @@ class Config:
             if f.endswith('.sumocfg'):
                 self._SUMOCFG = os.path.join(simdir, f)
         sumo_binary = os.path.join(os.environ['SUMO_HOME'], 'bin', self._SUMOCMD)
-        self.sumo_cmd = [sumo_binary, "-c", self._SUMOCFG]
\ No newline at end of file
+        self.sumo_cmd = [sumo_binary, "-c", self._SUMOCFG]
+        if self.seed is not None:
+            self.sumo_cmd += ['--seed', str(self.seed)]
\ No newline at end of file
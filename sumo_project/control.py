@@ -0,0 +1,58 @@
+"""
+This module measures the accuracy of a control period longer than one step,
+the areas being evaluated and acted on only at the controller ticks
+"""
+
+import numpy as np
+
+
+class ControlLag:
+    """
+    The ControlLag class compares at each step the state of each area decided at the last controller tick
+    (over the emissions threshold or not) to the state a control at every step would decide.
+    It counts the area-steps where both states differ, and the number of steps between the change
+    of state of an area and the tick acting on it.
+    """
+
+    def __init__(self, n_areas):
+        """
+        ControlLag constructor
+        :param n_areas: The number of areas
+        """
+        self.controlled = np.zeros(n_areas, dtype=bool)
+        self.changed_since = np.full(n_areas, -1, dtype=np.int64)
+        self.area_steps = 0
+        self.mismatches = 0
+        self.latencies = []
+
+    def update(self, step, over, tick):
+        """
+        Follow the state of the areas at a step
+        :param step: The simulation step
+        :param over: The boolean array of the areas over the emissions threshold at this step
+        :param tick: True if the areas are evaluated at this step
+        """
+        differs = over != self.controlled
+        waiting = differs & (self.changed_since < 0)
+        self.changed_since[waiting] = step
+        self.changed_since[~differs] = -1  # Back to the controlled state before any tick
+
+        self.area_steps += len(over)
+        if tick:
+            self.latencies.extend((step - self.changed_since[differs]).tolist())
+            self.controlled = over.copy()
+            self.changed_since[:] = -1
+        else:
+            self.mismatches += int(differs.sum())
+
+    def mismatch_percentage(self):
+        """
+        :return: The percentage of area-steps whose controlled state differs from a control at every step
+        """
+        return self.mismatches / self.area_steps * 100 if self.area_steps else 0.0
+
+    def mean_latency(self):
+        """
+        :return: The mean number of steps between the change of state of an area and the tick acting on it
+        """
+        return float(np.mean(self.latencies)) if self.latencies else 0.0
@@ -2,16 +2,43 @@
 This module is used for loading simulation data 
 """
 
-import json
+import multiprocessing
 import os
 import traci
 from typing import List
 
 import jsonpickle
-from parse import search
+import numpy as np
+import shapely
 from shapely.geometry import LineString
+from shapely.strtree import STRtree
 
+import dumpfile
 from model import Area, Lane, TrafficLight, Phase, Logic
+from netfile import Network
+
+
+"""
+Spatial index of the lanes, built once in each worker process of the area assignment
+"""
+_lanes_tree = None
+
+
+def _init_lanes_tree(polygons):
+    """
+    Build the spatial index of the lanes of a worker process
+    :param polygons: The lanes polygons
+    """
+    global _lanes_tree
+    _lanes_tree = STRtree(polygons)
+
+
+def _query_lanes_tree(rectangles):
+    """
+    :param rectangles: The areas rectangles
+    :return: The (area index, lane index) pairs of intersecting areas and lanes
+    """
+    return _lanes_tree.query(rectangles, predicate='intersects')
 
 
 class Data: 
@@ -28,6 +55,51 @@ class Data:
         self.map_bounds = map_bounds
         self.areas_number = areas_number
         self.dir = simulation_dir
+        self.lanes: List[Lane] = []
+        self.tls: List[TrafficLight] = []
+        self.partition = 'grid'
+        self.cells = None
+
+    def __getstate__(self):
+        """
+        :return: The state of the dump
+        """
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        """
+        Restore a dump, areas being linked back to the lanes and traffic lights tables
+        :param state: The state of the dump
+        """
+        self.__dict__.update(state)
+        self.__dict__.setdefault('partition', 'grid')
+        if self.__dict__.get('cells') is None:  # Dumps created before the cells lookup table
+            self.cells = self.grid_cells(self.areas_number)
+        if 'lanes' not in state:  # Dumps created before the tables
+            self.intern_topology()
+        else:
+            for area in self.grid:
+                area._lanes = {self.lanes[index] for index in area.lane_indexes}
+                area._tls = {self.tls[index] for index in area.tl_indexes}
+
+    def intern_topology(self):
+        """
+        Build the canonical tables of lanes and traffic lights, in which each one is stored once.
+        Areas share the same Lane and TrafficLight objects, and reference them by index.
+        """
+        lanes = {}
+        tls = {}
+        for area in self.grid:
+            area._lanes = {lanes.setdefault(lane.lane_id, lane) for lane in area._lanes}
+            area._tls = {tls.setdefault(tl.tl_id, tl) for tl in area._tls}
+        self.lanes = list(lanes.values())
+        self.tls = list(tls.values())
+
+        lane_indexes = {lane.lane_id: index for index, lane in enumerate(self.lanes)}
+        tl_indexes = {tl.tl_id: index for index, tl in enumerate(self.tls)}
+        for area in self.grid:
+            area.lane_indexes = sorted(lane_indexes[lane.lane_id] for lane in area._lanes)
+            area.tl_indexes = sorted(tl_indexes[tl.tl_id] for tl in area._tls)
         
     def init_grid(self):
         """
@@ -46,7 +118,117 @@ class Data:
                 name = 'Area ({},{})'.format(i, j)
                 area = Area(ar_bounds, name)
                 self.grid.append(area)
+        self.partition = 'grid'
+        self.cells = self.grid_cells(areas_number)
         return self.grid
+
+    @staticmethod
+    def grid_cells(areas_number):
+        """
+        :param areas_number: The number of areas in line and row of a regular grid
+        :return: The cells lookup table of the regular grid
+        """
+        return np.arange(areas_number * areas_number, dtype=np.int64).reshape(areas_number, areas_number)
+
+    def init_quadtree(self, lanes, max_depth, max_lanes):
+        """
+        Initialize an adaptive partitioning of the map with a quadtree :
+        an area is split into four areas while it is intersected by more than max_lanes lanes
+        and its depth is lower than max_depth. Areas without any lane are dropped.
+        :param lanes: The list of Lane objects of the map
+        :param max_depth: The maximum depth of the quadtree
+        :param max_lanes: The maximum number of lanes of an area, unless it is at the maximum depth
+        :return: The list of areas
+        """
+        self.grid = list()
+        self.partition = 'quadtree'
+        self.areas_number = 2 ** max_depth  # Resolution of the cells lookup table
+        self.cells = np.full((self.areas_number, self.areas_number), -1, dtype=np.int64)
+
+        tree = STRtree([lane.polygon for lane in lanes])
+        width = self.map_bounds[1][0] / self.areas_number
+        height = self.map_bounds[1][1] / self.areas_number
+        nodes = [(0, 0, 0)]  # (depth, i, j) of the quadtree nodes to visit
+        while nodes:
+            depth, i, j = nodes.pop()
+            span = 2 ** (max_depth - depth)  # Number of cells of the node in line and row
+            xmin, ymin = i * span * width, j * span * height
+            xmax, ymax = (i + 1) * span * width, (j + 1) * span * height
+            lanes_number = len(tree.query(shapely.box(xmin, ymin, xmax, ymax), predicate='intersects'))
+
+            if lanes_number == 0:
+                continue
+            if depth < max_depth and lanes_number > max_lanes:
+                nodes.extend((depth + 1, 2 * i + di, 2 * j + dj) for di in (1, 0) for dj in (1, 0))
+                continue
+
+            self.cells[i * span:(i + 1) * span, j * span:(j + 1) * span] = len(self.grid)
+            name = 'Area ({},{},{})'.format(depth, i, j)
+            self.grid.append(Area(((xmin, ymin), (xmin, ymax), (xmax, ymax), (xmax, ymin)), name))
+        return self.grid
+
+    def locate(self, xs, ys):
+        """
+        Find the index of the area containing each position with the cells lookup table,
+        which splits the map into a regular grid of cells and gives the area containing each cell
+        :param xs: The NumPy array of x coordinates
+        :param ys: The NumPy array of y coordinates
+        :return: The NumPy array of area indexes, -1 for the positions outside of all areas
+        """
+        rows, columns = self.cells.shape
+        width = self.map_bounds[1][0] / rows
+        height = self.map_bounds[1][1] / columns
+
+        i = np.floor(np.asarray(xs) / width).astype(np.int64)
+        j = np.floor(np.asarray(ys) / height).astype(np.int64)
+        inside = (i >= 0) & (i < rows) & (j >= 0) & (j < columns)
+        return np.where(inside, self.cells[np.where(inside, i, 0), np.where(inside, j, 0)], -1)
+
+    def sum_by_area(self, positions, values):
+        """
+        Sum values located on the map into the area containing them
+        :param positions: The NumPy array of positions, with shape (n, 2)
+        :param values: The NumPy array of values to sum, with shape (n, k)
+        :return: The NumPy array of sums, with shape (areas, k)
+        """
+        values = np.asarray(values, dtype=float)
+        sums = np.zeros((len(self.grid), values.shape[1]))
+        if len(values) == 0:
+            return sums
+
+        positions = np.asarray(positions, dtype=float)
+        indexes = self.locate(positions[:, 0], positions[:, 1])
+        inside = indexes >= 0
+        np.add.at(sums, indexes[inside], values[inside])
+        return sums
+
+    def lanes_to_areas(self):
+        """
+        Build the lane -> area index matrix in a sparse form.
+        A lane is weighted in each area by the share of its length inside the area.
+        Lanes are ordered by their first area, then by lane ID, so that the matrix does not depend
+        on the iteration order of the lane sets.
+        :return: The list of lane IDs, and the (lane indexes, area indexes, weights) NumPy arrays
+        """
+        lanes_areas = {}
+        for area_index, area in enumerate(self.grid):
+            for lane in sorted(area._lanes, key=lambda lane: lane.lane_id):
+                lanes_areas.setdefault(lane.lane_id, (lane, []))[1].append(area_index)
+
+        lane_ids, lane_indexes, area_indexes, weights = [], [], [], []
+        for lane_index, (lane_id, (lane, areas)) in enumerate(lanes_areas.items()):
+            lane_ids.append(lane_id)
+            for area_index in areas:
+                lane_indexes.append(lane_index)
+                area_indexes.append(area_index)
+                if lane.polygon.length > 0:
+                    area = self.grid[area_index]
+                    weights.append(area.rectangle.intersection(lane.polygon).length / lane.polygon.length)
+                else:
+                    weights.append(1 / len(areas))
+
+        return lane_ids, (np.array(lane_indexes, dtype=np.int64), np.array(area_indexes, dtype=np.int64),
+                          np.array(weights, dtype=float))
     
     def get_all_lanes(self) -> List[Lane]:
         """
@@ -60,60 +242,188 @@ class Data:
             lanes.append(Lane(lane_id, polygon_lane, initial_max_speed))
         return lanes
     
-    def parse_phase(self, phase_repr):
+    def get_traffic_light(self, tl_id) -> TrafficLight:
         """
-        Because the SUMO object Phase does not contain accessors,
-        we parse the string representation to retrieve data members.
-        :param phase_repr: The Phase string representation
-        :return: An new Phase instance
+        Recover a traffic light with all its logics and phases
+        :param tl_id: The traffic light ID
+        :return: A new TrafficLight instance
         """
-        duration = search('duration: {:f}', phase_repr)
-        min_duration = search('minDuration: {:f}', phase_repr)
-        max_duration = search('maxDuration: {:f}', phase_repr)
-        phase_def = search('phaseDef: {}\n', phase_repr)
-    
-        if phase_def is None:
-            phase_def = ''
-        else:
-            phase_def = phase_def[0]
-    
-    
-        
-    
-        return Phase(duration[0], min_duration[0], max_duration[0], phase_def)
-    
-    def add_data_to_areas(self):
+        logics = []
+        for l in traci.trafficlight.getCompleteRedYellowGreenDefinition(tl_id):  # add logics
+            phases = [Phase.from_sumo(phase) for phase in l.getPhases()]  # add phases to logics
+            logics.append(Logic(l, phases))
+        return TrafficLight(tl_id, logics)
+
+    def get_controlling_traffic_lights(self):
+        """
+        Build the inverted index of the traffic lights controlling each lane
+        :return: A dictionary associating a lane ID with the list of IDs of traffic lights controlling it
+        """
+        lanes_tls = {}
+        for tl_id in traci.trafficlight.getIDList():
+            for lane_id in set(traci.trafficlight.getControlledLanes(tl_id)):
+                lanes_tls.setdefault(lane_id, []).append(tl_id)
+        return lanes_tls
+
+    def get_network(self) -> Network:
+        """
+        Recover the network data with TraCI
+        :return: A new Network instance
         """
-        Adds all recovered data to different areas
-        :param areas: The list of areas
+        tls = {tl_id: self.get_traffic_light(tl_id) for tl_id in traci.trafficlight.getIDList()}
+        return Network(traci.simulation.getNetBoundary(), self.get_all_lanes(), tls,
+                       self.get_controlling_traffic_lights())
+
+    def add_data_to_areas(self, processes=1):
+        """
+        Adds all data recovered with TraCI to different areas
+        :param processes: The number of processes used to assign lanes to areas
         :return:
         """
         lanes = self.get_all_lanes()
-        for area in self.grid:
-            for lane in lanes:  # add lanes 
-                if area.rectangle.intersects(lane.polygon):
-                    area.add_lane(lane)
-                    for tl_id in traci.trafficlight.getIDList():  # add traffic lights 
-                        if lane.lane_id in traci.trafficlight.getControlledLanes(tl_id):
-                            logics = []
-                            for l in traci.trafficlight.getCompleteRedYellowGreenDefinition(tl_id):  # add logics 
-                                phases = []
-                                for phase in traci.trafficlight.Logic.getPhases(l):  # add phases to logics
-                                    phases.append(self.parse_phase(phase.__repr__()))
-                                logics.append(Logic(l, phases))
-                            area.add_tl(TrafficLight(tl_id, logics))
-                            
-    def save(self):
+        lanes_tls = self.get_controlling_traffic_lights()
+        self.add_lanes_to_areas(lanes, lanes_tls, self.get_traffic_light, processes)
+
+    def add_net_data_to_areas(self, network, processes=1):
         """
-        Save simulation data into a json file 
-        :param dump_name: The name of your data dump
+        Adds all data of a network to different areas, without launching SUMO
+        :param network: The Network instance, read from the net file or from the cache
+        :param processes: The number of processes used to assign lanes to areas
         :return:
         """
+        self.add_lanes_to_areas(network.lanes, network.lanes_tls, network.tls.__getitem__, processes)
+
+    def add_lanes_to_areas(self, lanes, lanes_tls, get_traffic_light, processes=1):
+        """
+        Adds lanes and the traffic lights controlling them to the areas they intersect.
+        Lanes intersecting an area are found with a spatial index,
+        and each traffic light is recovered only once.
+        :param lanes: The list of Lane objects
+        :param lanes_tls: The dictionary associating a lane ID with the IDs of traffic lights controlling it
+        :param get_traffic_light: A function returning the TrafficLight object of a traffic light ID
+        :param processes: The number of processes used to assign lanes to areas
+        :return:
+        """
+        tls = {}
+        for area_index, lane_index in self.intersecting_lanes(lanes, processes):
+            area = self.grid[area_index]
+            lane = lanes[lane_index]
+            area.add_lane(lane)  # add lanes
+            for tl_id in lanes_tls.get(lane.lane_id, []):  # add traffic lights
+                if tl_id not in tls:
+                    tls[tl_id] = get_traffic_light(tl_id)
+                area.add_tl(tls[tl_id])
+        self.intern_topology()
+
+    def intersecting_lanes(self, lanes, processes=1):
+        """
+        Find the lanes intersecting each area with a spatial index.
+        Areas are split between a pool of processes if processes > 1.
+        :param lanes: The list of Lane objects
+        :param processes: The number of processes
+        :return: The list of (area index, lane index) pairs
+        """
+        polygons = [lane.polygon for lane in lanes]
+        rectangles = [area.rectangle for area in self.grid]
+        if processes <= 1:
+            _init_lanes_tree(polygons)
+            return _query_lanes_tree(rectangles).T.tolist()
+
+        chunks = np.array_split(np.arange(len(rectangles)), processes)
+        with multiprocessing.Pool(processes, initializer=_init_lanes_tree, initargs=(polygons,)) as pool:
+            results = pool.map(_query_lanes_tree, [[rectangles[i] for i in chunk] for chunk in chunks])
+
+        pairs = []
+        for chunk, (area_indexes, lane_indexes) in zip(chunks, results):
+            pairs.extend(zip(chunk[area_indexes].tolist(), lane_indexes.tolist()))
+        return pairs
+
+    def to_arrays(self):
+        """
+        Convert the dump into tables of NumPy arrays, geometries being stored as packed coordinates
+        :return: The metadata dictionary and the dictionary of arrays
+        """
+        meta = {
+            'dump_name': self.dump_name,
+            'map_bounds': self.map_bounds,
+            'areas_number': self.areas_number,
+            'dir': self.dir,
+            'partition': self.partition
+        }
+        arrays = {**dumpfile.lanes_to_arrays(self.lanes), **dumpfile.tls_to_arrays(self.tls)}
+
+        # Areas table, referencing lanes and traffic lights by index
+        arrays['area_names'], arrays['area_names_offsets'] = dumpfile.pack_strings([a.name for a in self.grid])
+        arrays['area_bounds'] = np.array([area.bounds for area in self.grid], dtype=np.float64).reshape(-1, 4)
+        arrays['area_lanes'] = np.array([i for area in self.grid for i in area.lane_indexes], dtype=np.int64)
+        arrays['area_lanes_offsets'] = np.cumsum([0] + [len(a.lane_indexes) for a in self.grid], dtype=np.int64)
+        arrays['area_tls'] = np.array([i for area in self.grid for i in area.tl_indexes], dtype=np.int64)
+        arrays['area_tls_offsets'] = np.cumsum([0] + [len(a.tl_indexes) for a in self.grid], dtype=np.int64)
+        arrays['area_cells'] = self.cells
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays, shared=False):
+        """
+        Build a dump from its tables of NumPy arrays
+        :param meta: The metadata dictionary
+        :param arrays: The dictionary of arrays
+        :param shared: If True, the lanes shapes are views on the arrays instead of being copied into polygons
+        :return: A new Data instance
+        """
+        map_bounds = tuple(tuple(point) for point in meta['map_bounds'])
+        data = cls(meta['dump_name'], map_bounds, meta['areas_number'], meta['dir'])
+        data.partition = meta.get('partition', 'grid')
+        data.cells = arrays['area_cells'] if 'area_cells' in arrays else cls.grid_cells(data.areas_number)
+
+        data.lanes = dumpfile.lanes_from_arrays(arrays, shared)
+        data.tls = dumpfile.tls_from_arrays(arrays)
+
+        # Areas table, referencing lanes and traffic lights by index
+        data.grid = []
+        names = dumpfile.unpack_strings(arrays['area_names'], arrays['area_names_offsets'])
+        lanes_offsets = arrays['area_lanes_offsets'].tolist()
+        tls_offsets = arrays['area_tls_offsets'].tolist()
+        for index, (name, (xmin, ymin, xmax, ymax)) in enumerate(zip(names, arrays['area_bounds'].tolist())):
+            area = Area(((xmin, ymin), (xmin, ymax), (xmax, ymax), (xmax, ymin)), name)
+            area.lane_indexes = arrays['area_lanes'][lanes_offsets[index]:lanes_offsets[index + 1]].tolist()
+            area.tl_indexes = arrays['area_tls'][tls_offsets[index]:tls_offsets[index + 1]].tolist()
+            area._lanes = {data.lanes[i] for i in area.lane_indexes}
+            area._tls = {data.tls[i] for i in area.tl_indexes}
+            data.grid.append(area)
+        return data
+
+    def save(self):
+        """
+        Save simulation data into a binary dump file
+        :return: The path to the dump file
+        """
         dump_dir = f'{self.dir}/dump'
         if not os.path.exists(dump_dir):
             os.mkdir(dump_dir)
-        
-        s = json.dumps(json.loads(jsonpickle.encode(self)), indent=4)  # for pretty JSON 
-        with open(f'{dump_dir}/{self.dump_name}.json', 'w') as f:
-            f.write(s)
+
+        path = f'{dump_dir}/{self.dump_name}.dump'
+        meta, arrays = self.to_arrays()
+        dumpfile.write(path, meta, arrays)
+        return path
+
+    @classmethod
+    def load(cls, path, use_mmap=False):
+        """
+        Load a dump, either in the binary format or in the former JSON format
+        :param path: The path to the dump file
+        :param use_mmap: If True, a binary dump is memory-mapped : its tables are shared read-only
+        by all processes loading it, and the lanes shapes are read from them on demand
+        :return: The Data instance
+        """
+        if dumpfile.is_dump_file(path):
+            meta, arrays = dumpfile.read(path, use_mmap)
+            return cls.from_arrays(meta, arrays, shared=use_mmap)
+
+        with open(path, 'r') as f:
+            data = jsonpickle.decode(f.read())
+        if 'lanes' not in data.__dict__:
+            # JSON dumps created before the tables have no saved state, so jsonpickle does not call __setstate__
+            data.__setstate__(data.__dict__.copy())
+        return data
         
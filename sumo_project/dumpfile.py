@@ -0,0 +1,206 @@
+"""
+This module defines the binary format of data dumps.
+
+A dump file starts with a magic string, the format version and the length of a JSON header.
+The header holds the dump metadata and describes the arrays (dtype, shape, offset)
+stored after it. Each array is aligned, so that it can be read without copy from a memory-mapped file.
+"""
+
+import json
+import mmap
+import struct
+
+import numpy as np
+import shapely
+
+from model import Lane, Logic, Phase, SharedLane, TrafficLight, create_sumo_logic
+
+MAGIC = b'SUMODUMP'
+VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+
+def _padding(offset):
+    """
+    :param offset: An offset into the file
+    :return: The number of bytes to add to align the offset
+    """
+    return -offset % ALIGNMENT
+
+
+def pack_strings(strings):
+    """
+    Pack a list of strings into a bytes array and an offsets array
+    :param strings: The list of strings
+    :return: The (data, offsets) NumPy arrays
+    """
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(data, offsets):
+    """
+    :param data: The bytes array of packed strings
+    :param offsets: The offsets array of packed strings
+    :return: The list of strings
+    """
+    raw = data.tobytes()
+    return [raw[start:stop].decode('utf-8') for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def write(path, meta, arrays):
+    """
+    Write a dump file
+    :param path: The path to the dump file
+    :param meta: A dictionary of metadata, serializable in JSON
+    :param arrays: A dictionary of NumPy arrays
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # The header size depends on the offsets : compute them with the final header length
+    descriptions = {name: {'dtype': array.dtype.str, 'shape': array.shape, 'offset': 0}
+                    for name, array in arrays.items()}
+    header_length = 0
+    while True:
+        offset = _PREAMBLE.size + header_length
+        offset += _padding(offset)
+        for name, array in arrays.items():
+            descriptions[name]['offset'] = offset
+            offset += array.nbytes
+            offset += _padding(offset)
+        header = json.dumps({'meta': meta, 'arrays': descriptions}).encode('utf-8')
+        if len(header) == header_length:
+            break
+        header_length = len(header)
+
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b'\0' * (descriptions[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+
+
+def is_dump_file(path):
+    """
+    :param path: The path to a file
+    :return: True if the file is a binary dump
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read(path, use_mmap=False):
+    """
+    Read a dump file
+    :param path: The path to the dump file
+    :param use_mmap: If True, arrays are read-only views on the memory-mapped file,
+    shared between all processes reading the same dump
+    :return: The metadata dictionary and the dictionary of NumPy arrays
+    """
+    with open(path, 'rb') as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a dump file')
+    if version != VERSION:
+        raise ValueError(f'Unsupported dump version {version} in {path} (supported version : {VERSION})')
+
+    header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length]).decode('utf-8'))
+    arrays = {}
+    for name, description in header['arrays'].items():
+        dtype = np.dtype(description['dtype'])
+        shape = tuple(description['shape'])
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                         offset=description['offset']).reshape(shape)
+    return header['meta'], arrays
+
+
+def lanes_to_arrays(lanes):
+    """
+    Convert a list of lanes into a table, lane shapes being stored as packed coordinates
+    :param lanes: The list of Lane objects
+    :return: The dictionary of arrays of the lanes table
+    """
+    arrays = {}
+    arrays['lane_ids'], arrays['lane_ids_offsets'] = pack_strings([lane.lane_id for lane in lanes])
+    arrays['lane_speeds'] = np.array([lane.initial_max_speed for lane in lanes], dtype=np.float64)
+    coords = [np.asarray(lane.polygon.coords, dtype=np.float64).reshape(-1, 2) for lane in lanes]
+    arrays['lane_coords'] = np.concatenate(coords) if coords else np.empty((0, 2))
+    arrays['lane_coords_offsets'] = np.cumsum([0] + [len(c) for c in coords], dtype=np.int64)
+    return arrays
+
+
+def lanes_from_arrays(arrays, shared=False):
+    """
+    :param arrays: The dictionary of arrays containing a lanes table
+    :param shared: If True, lanes are SharedLane objects whose shapes are views on the coordinates array
+    :return: The list of Lane objects
+    """
+    lane_ids = unpack_strings(arrays['lane_ids'], arrays['lane_ids_offsets'])
+    if shared:
+        coords, offsets = arrays['lane_coords'], arrays['lane_coords_offsets'].tolist()
+        return [SharedLane(lane_id, coords[offsets[i]:offsets[i + 1]], speed)
+                for i, (lane_id, speed) in enumerate(zip(lane_ids, arrays['lane_speeds'].tolist()))]
+
+    polygons = shapely.linestrings(arrays['lane_coords'], indices=np.repeat(
+        np.arange(len(lane_ids)), np.diff(arrays['lane_coords_offsets'])))
+    return [Lane(lane_id, polygon, speed)
+            for lane_id, polygon, speed in zip(lane_ids, polygons, arrays['lane_speeds'].tolist())]
+
+
+def tls_to_arrays(tls):
+    """
+    Convert a list of traffic lights into the traffic lights, logics and phases tables
+    :param tls: The list of TrafficLight objects
+    :return: The dictionary of arrays of the tables
+    """
+    logics = [logic for tl in tls for logic in tl._logics]
+    phases = [phase for logic in logics for phase in logic._phases]
+
+    arrays = {}
+    arrays['tl_ids'], arrays['tl_ids_offsets'] = pack_strings([tl.tl_id for tl in tls])
+    arrays['tl_logics_offsets'] = np.cumsum([0] + [len(tl._logics) for tl in tls], dtype=np.int64)
+    arrays['logic_program_ids'], arrays['logic_program_ids_offsets'] = pack_strings(
+        [str(getattr(logic._logic, 'programID', getattr(logic._logic, '_subID', ''))) for logic in logics])
+    arrays['logic_types'] = np.array([getattr(logic._logic, 'type', getattr(logic._logic, '_type', 0))
+                                      for logic in logics], dtype=np.int32)
+    arrays['logic_phases_offsets'] = np.cumsum([0] + [len(logic._phases) for logic in logics], dtype=np.int64)
+    arrays['phase_durations'] = np.array([(p.duration, p.minDuration, p.maxDuration) for p in phases],
+                                         dtype=np.float64).reshape(-1, 3)
+    arrays['phase_defs'], arrays['phase_defs_offsets'] = pack_strings([p.phaseDef for p in phases])
+    return arrays
+
+
+def tls_from_arrays(arrays):
+    """
+    :param arrays: The dictionary of arrays containing the traffic lights, logics and phases tables
+    :return: The list of TrafficLight objects
+    """
+    phase_defs = unpack_strings(arrays['phase_defs'], arrays['phase_defs_offsets'])
+    phases = [Phase(duration, min_duration, max_duration, phase_def) for (duration, min_duration, max_duration),
+              phase_def in zip(arrays['phase_durations'].tolist(), phase_defs)]
+
+    program_ids = unpack_strings(arrays['logic_program_ids'], arrays['logic_program_ids_offsets'])
+    phases_offsets = arrays['logic_phases_offsets'].tolist()
+    logics = []
+    for index, (program_id, tl_type) in enumerate(zip(program_ids, arrays['logic_types'].tolist())):
+        logic_phases = phases[phases_offsets[index]:phases_offsets[index + 1]]
+        sumo_logic = create_sumo_logic(program_id, tl_type, [phase.to_sumo() for phase in logic_phases])
+        logics.append(Logic(sumo_logic, logic_phases))
+
+    tl_ids = unpack_strings(arrays['tl_ids'], arrays['tl_ids_offsets'])
+    logics_offsets = arrays['tl_logics_offsets'].tolist()
+    return [TrafficLight(tl_id, logics[logics_offsets[i]:logics_offsets[i + 1]]) for i, tl_id in enumerate(tl_ids)]
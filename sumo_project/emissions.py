@@ -2,12 +2,19 @@
 This module defines how pollutant emissions are recovered and how we act on the areas 
 """
 
+from __future__ import annotations
+
 import traci
-from typing import List
+from traci import constants as tc
+from typing import List, TYPE_CHECKING
+
+import numpy as np
 
 import actions
-from model import  Vehicle, Emission
-from runner import RunProcess
+from model import Vehicle, Emission
+
+if TYPE_CHECKING:  # The runner imports this module
+    from runner import RunProcess
 
 
 def compute_vehicle_emissions(veh_id):
@@ -38,26 +45,101 @@ def get_all_vehicles() -> List[Vehicle]:
         vehicles.append(vehicle)
     return vehicles
 
-def get_emissions(p : RunProcess, vehicles: List[Vehicle], current_step):
+
+"""
+Variables subscribed for each lane in lane aggregation mode : pollutant emissions
+"""
+LANE_VARIABLES = (tc.VAR_CO2EMISSION, tc.VAR_COEMISSION, tc.VAR_NOXEMISSION, tc.VAR_HCEMISSION, tc.VAR_PMXEMISSION)
+
+
+def subscribe_lanes(p: RunProcess):
+    """
+    Build the lane -> area index matrix and subscribe all lanes of the areas to their pollutant emissions
+    :param p: The current process
+    :return:
+    """
+    p.lane_ids, p.lanes_matrix = p.data.lanes_to_areas()
+    for lane_id in p.lane_ids:
+        traci.lane.subscribe(lane_id, LANE_VARIABLES)
+
+
+def get_lanes_emissions(p: RunProcess):
+    """
+    Sum the emissions of the subscribed lanes into the areas, through the lane -> area index matrix.
+    The number of requests only depends on the network size, not on the number of vehicles.
+    :param p: The current process
+    :return: The array of emissions with shape (areas, pollutants)
+    """
+    return sum_lanes_emissions(p, traci.lane.getAllSubscriptionResults())
+
+
+def fetch_lanes_emissions():
+    """
+    :return: The emissions of the subscribed lanes at the last step, kept after the next step
+    """
+    return dict(traci.lane.getAllSubscriptionResults())
+
+
+def sum_lanes_emissions(p: RunProcess, results):
+    """
+    Sum the emissions of the lanes into the areas
+    :param p: The current process
+    :param results: The subscription results of the lanes
+    :return: The array of emissions with shape (areas, pollutants)
+    """
+    lanes_emissions = np.array([[results[lane_id][variable] for variable in LANE_VARIABLES]
+                                for lane_id in p.lane_ids]).reshape(-1, len(LANE_VARIABLES))
+
+    lane_indexes, area_indexes, weights = p.lanes_matrix
+    areas_emissions = np.zeros((len(p.data.grid), len(LANE_VARIABLES)))
+    np.add.at(areas_emissions, area_indexes, lanes_emissions[lane_indexes] * weights[:, np.newaxis])
+    return areas_emissions
+
+
+def get_emissions(p: RunProcess, areas_emissions, current_step):
     """
     For each area retrieves the acquired emissions in the window,
-    and acts according to the configuration chosen by the user
+    and acts according to the configuration chosen by the user.
+    Emissions are acquired at every step, but areas are evaluated only every control_period steps.
     :param p: The current process
-    :param vehicles: The list of vehicles
+    :param areas_emissions: The array of emissions of the current step, with shape (areas, pollutants)
     :param current_step: The simulation current step
     :return:
     """
-    for area in p.data.grid:
-        total_emissions = Emission()
-        for vehicle in vehicles:
-            if vehicle.pos in area:
-                total_emissions += vehicle.emissions
+    windows_emissions = acquire_emissions(p, areas_emissions, current_step)
+    if windows_emissions is not None:
+        act_on_areas(p, windows_emissions)
+
+
+def acquire_emissions(p: RunProcess, areas_emissions, current_step):
+    """
+    Store the emissions of a step and add them into the acquisition window
+    :param p: The current process
+    :param areas_emissions: The array of emissions of the current step, with shape (areas, pollutants)
+    :param current_step: The simulation current step
+    :return: The sum of all pollutant emissions (in mg) into the window for each area
+    if the areas are evaluated at this step, None otherwise
+    """
+    # Adding of the total of emissions pollutant at the current step into memory
+    p.store.add_step(current_step, areas_emissions)
+    windows_emissions = p.window.add(areas_emissions)
+
+    tick = (current_step + 1) % p.config.control_period == 0
+    p.control_lag.update(current_step, windows_emissions >= p.config.emissions_threshold, tick)
+    return windows_emissions if tick else None
 
-        # Adding of the total of emissions pollutant at the current step into memory
-        area.emissions_by_step.append(total_emissions)
-        
+
+def act_on_areas(p: RunProcess, windows_emissions):
+    """
+    Act on the areas whose emissions into the window exceed the threshold,
+    and reverse the actions of the areas below the threshold
+    :param p: The current process
+    :param windows_emissions: The sum of all pollutant emissions (in mg) into the window for each area
+    :return:
+    """
+    for area, window_emissions in zip(p.data.grid, windows_emissions.tolist()):
         # If the sum of pollutant emissions (in mg) exceeds the threshold
-        if area.sum_emissions_into_window(current_step) >= p.config.emissions_threshold:
+        if window_emissions >= p.config.emissions_threshold:
 
             if p.config.limit_speed_mode and not area.limited_speed:
                 p.logger.info(f'Action - Decreased max speed into {area.name} by {p.config.speed_rf * 100}%')
@@ -0,0 +1,173 @@
+"""
+This module exports the emissions of the areas while the simulation is running,
+by batches of steps written into a CSV file or into columnar NumPy chunks
+"""
+
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from model import POLLUTANTS
+
+
+class Exporter(ABC):
+    """
+    The Exporter class buffers the emissions of the last steps and writes them by batches,
+    so that the memory used is bounded and the data already written can be read during the simulation
+    """
+
+    def __init__(self, path, area_names, batch_size=100):
+        """
+        Exporter constructor
+        :param path: The path to the export
+        :param area_names: The names of the areas
+        :param batch_size: The number of steps written at once
+        """
+        self.path = path
+        self.area_names = list(area_names)
+        self.batch_size = batch_size
+        self._steps = np.zeros(batch_size, dtype=np.int64)
+        self._emissions = np.zeros((batch_size, len(self.area_names), len(POLLUTANTS)))
+        self._count = 0
+
+    def add_step(self, step, areas_emissions):
+        """
+        Add the emissions of a step, the batch being written when it is full
+        :param step: The simulation step
+        :param areas_emissions: The array of emissions with shape (areas, pollutants)
+        """
+        self._steps[self._count] = step
+        self._emissions[self._count] = areas_emissions
+        self._count += 1
+        if self._count == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the steps of the current batch
+        """
+        if self._count:
+            self.write_batch(self._steps[:self._count], self._emissions[:self._count])
+            self._count = 0
+
+    @abstractmethod
+    def write_batch(self, steps, emissions):
+        """
+        Write a batch of steps
+        :param steps: The array of steps
+        :param emissions: The array of emissions with shape (steps, areas, pollutants)
+        """
+
+    def close(self):
+        """
+        Write the last steps and close the export
+        """
+        self.flush()
+
+
+class CsvExporter(Exporter):
+    """
+    The CsvExporter class writes the sum of all pollutant emissions of each area into a CSV file,
+    with a row for each step and a column for each area
+    """
+
+    extension = 'csv'
+
+    def __init__(self, path, area_names, batch_size=100):
+        """
+        CsvExporter constructor
+        :param path: The path to the CSV file
+        :param area_names: The names of the areas
+        :param batch_size: The number of steps written at once
+        """
+        super().__init__(path, area_names, batch_size)
+        self._file = open(path, 'w', newline='')
+        csv.writer(self._file).writerow(['Step'] + self.area_names)
+
+    def write_batch(self, steps, emissions):
+        """
+        Write a batch of rows
+        :param steps: The array of steps
+        :param emissions: The array of emissions with shape (steps, areas, pollutants)
+        """
+        rows = np.column_stack((steps, emissions.sum(axis=2)))
+        np.savetxt(self._file, rows, fmt=['%d'] + ['%.3f'] * len(self.area_names), delimiter=',', newline='\r\n')
+        self._file.flush()
+
+    def close(self):
+        """
+        Write the last rows and close the CSV file
+        """
+        super().close()
+        self._file.close()
+
+
+class NpzExporter(Exporter):
+    """
+    The NpzExporter class writes each batch as a compressed NumPy chunk into a directory,
+    with the emissions of each pollutant. An index file lists the areas, the pollutants and the chunks written.
+    """
+
+    extension = 'npz'
+
+    def __init__(self, path, area_names, batch_size=100):
+        """
+        NpzExporter constructor
+        :param path: The path to the export directory
+        :param area_names: The names of the areas
+        :param batch_size: The number of steps written into each chunk
+        """
+        super().__init__(path, area_names, batch_size)
+        os.makedirs(path)
+        self.chunks = []
+        self._write_index()
+
+    def _write_index(self):
+        """
+        Write the index file, replaced at once so that a reader never sees a partial index
+        """
+        index = {'areas': self.area_names, 'pollutants': list(POLLUTANTS), 'chunks': self.chunks}
+        tmp_path = os.path.join(self.path, 'index.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(self.path, 'index.json'))
+
+    def write_batch(self, steps, emissions):
+        """
+        Write a chunk
+        :param steps: The array of steps
+        :param emissions: The array of emissions with shape (steps, areas, pollutants)
+        """
+        name = f'chunk_{len(self.chunks):05d}.npz'
+        np.savez_compressed(os.path.join(self.path, name), steps=steps, emissions=emissions)
+        self.chunks.append(name)
+        self._write_index()
+
+
+"""
+Available export formats
+"""
+EXPORTERS = {
+    'csv': CsvExporter,
+    'npz': NpzExporter
+}
+
+
+def read_npz_export(path):
+    """
+    Read the chunks written into a NumPy export, even while the simulation is running
+    :param path: The path to the export directory
+    :return: The area names, the array of steps and the array of emissions with shape (steps, areas, pollutants)
+    """
+    with open(os.path.join(path, 'index.json'), 'r') as f:
+        index = json.load(f)
+
+    steps, emissions = [np.zeros(0, dtype=np.int64)], [np.zeros((0, len(index['areas']), len(POLLUTANTS)))]
+    for name in index['chunks']:
+        with np.load(os.path.join(path, name)) as chunk:
+            steps.append(chunk['steps'])
+            emissions.append(chunk['emissions'])
+    return index['areas'], np.concatenate(steps), np.concatenate(emissions)
@@ -2,10 +2,12 @@
 This module defines the business model of our application
 """
 
-import collections
+import inspect
+import traci
 from traci._trafficlight import Logic as SUMO_Logic
-from typing import Tuple, Set
+from typing import List, Tuple, Set
 
+import numpy as np
 from shapely.geometry import Point, LineString
 from shapely.geometry import Polygon
 from shapely.geometry.base import BaseGeometry
@@ -34,6 +36,42 @@ class Lane:
         return hash(self.lane_id)
 
 
+class SharedLane(Lane):
+    """
+    The SharedLane class defines a lane loaded from a memory-mapped dump :
+    its shape is a read-only view on the coordinates of the dump, shared by all processes,
+    and its polygon is only built when it is needed
+    """
+
+    def __init__(self, lane_id: str, coords: np.ndarray, initial_max_speed: float):
+        """
+        SharedLane constructor
+        :param lane_id: The ID of the lane
+        :param coords: The read-only array of coordinates of the lane shape, with shape (points, 2)
+        :param initial_max_speed: The initial maximum speed
+        """
+        self.lane_id = lane_id
+        self.coords = coords
+        self.initial_max_speed = initial_max_speed
+        self._polygon = None
+
+    @property
+    def polygon(self) -> LineString:
+        """
+        :return: The polygon defining the shape of the lane
+        """
+        if self._polygon is None:
+            self._polygon = LineString(self.coords)
+        return self._polygon
+
+
+"""
+Constructors of the SUMO phases and logics, whose parameters changed with SUMO 1.1
+"""
+_PHASE_STATE_FIRST = 'state' in inspect.signature(traci.trafficlight.Phase).parameters
+_LOGIC_PROGRAM_ID = 'programID' in inspect.signature(SUMO_Logic).parameters
+
+
 class Phase:
     """
     The Phase class defines a phase of a traffic light
@@ -55,6 +93,32 @@ class Phase:
         self.maxDuration = maxDuration
         self.phaseDef = phaseDef
 
+    @classmethod
+    def from_sumo(cls, phase):
+        """
+        Create a Phase by reading directly the fields of a SUMO phase.
+        These fields are private until SUMO 1.0 and public since SUMO 1.1.
+        :param phase: The SUMO Phase object
+        :return: A new Phase instance
+        """
+        if hasattr(phase, 'state'):
+            return cls(phase.duration, phase.minDur, phase.maxDur, phase.state)
+        return cls(phase._duration, phase._duration1, phase._duration2, phase._phaseDef)
+
+    def to_sumo(self, duration_rf=1):
+        """
+        Create the SUMO phase corresponding to this phase,
+        following the constructor of SUMO 1.0 or of later versions
+        :param duration_rf: The reduction factor applied to all durations
+        :return: A new SUMO Phase object
+        """
+        duration = self.duration * duration_rf
+        min_duration = self.minDuration * duration_rf
+        max_duration = self.maxDuration * duration_rf
+        if _PHASE_STATE_FIRST:
+            return traci.trafficlight.Phase(duration, self.phaseDef, min_duration, max_duration)
+        return traci.trafficlight.Phase(duration, min_duration, max_duration, self.phaseDef)
+
     def __repr__(self) -> str:
         """
         :return: The Phase string representation
@@ -63,6 +127,19 @@ class Phase:
         return str(repr)
 
 
+def create_sumo_logic(program_id, tl_type, phases):
+    """
+    Create a SUMO logic, following the constructor of SUMO 1.0 or of later versions
+    :param program_id: The ID of the traffic light program
+    :param tl_type: The TraCI traffic light type
+    :param phases: The list of SUMO phases
+    :return: A new SUMO Logic object starting at the first phase
+    """
+    if _LOGIC_PROGRAM_ID:
+        return SUMO_Logic(program_id, tl_type, 0, phases)
+    return SUMO_Logic(program_id, tl_type, 0, 0, phases)
+
+
 class Logic:
     """
     The Logic class defines the strategy of a traffic light.
@@ -99,49 +176,123 @@ class TrafficLight:
         return hash(self.tl_id)
 
 
-class Emission:
+"""
+Names of the pollutants, in the order used by emissions arrays
+"""
+POLLUTANTS = ('co2', 'co', 'nox', 'hc', 'pmx')
+
+
+class EmissionVector:
     """
-    This class defines the different pollutant emissions
+    This class defines the different pollutant emissions, stored into a NumPy array
+    in the order of POLLUTANTS
     """
 
+    __slots__ = ('values',)
+
     def __init__(self, co2=0, co=0, nox=0, hc=0, pmx=0):
         """
-        Emission constructor
+        EmissionVector constructor
         :param co2: Quantity of CO2(in mg)
         :param co: Quantity of C0(in mg)
         :param nox: Quantity of Nox(in mg)
         :param hc: Quantity of HC(in mg)
         :param pmx: Quantity of PMx(in mg)
         """
-        self.co2 = co2
-        self.co = co
-        self.nox = nox
-        self.hc = hc
-        self.pmx = pmx
+        self.values = np.array((co2, co, nox, hc, pmx), dtype=float)
+
+    @classmethod
+    def from_array(cls, values):
+        """
+        Create an EmissionVector sharing the memory of an array of pollutant emissions
+        :param values: An array of length 5, in the order of POLLUTANTS
+        :return: A new EmissionVector instance
+        """
+        emission = cls.__new__(cls)
+        emission.values = np.asarray(values, dtype=float)
+        return emission
+
+    @classmethod
+    def sum(cls, emissions):
+        """
+        Sum a sequence of emissions with a single vector operation
+        :param emissions: A sequence of EmissionVector objects
+        :return: A new EmissionVector instance
+        """
+        values = [emission.values for emission in emissions]
+        if not values:
+            return cls()
+        return cls.from_array(np.sum(values, axis=0))
+
+    def __getitem__(self, pollutant):
+        """
+        :param pollutant: The name of a pollutant (co2, co, nox, hc, pmx)
+        :return: The quantity of this pollutant (in mg)
+        """
+        return float(self.values[POLLUTANTS.index(pollutant)])
+
+    @property
+    def co2(self):
+        return float(self.values[0])
+
+    @property
+    def co(self):
+        return float(self.values[1])
+
+    @property
+    def nox(self):
+        return float(self.values[2])
+
+    @property
+    def hc(self):
+        return float(self.values[3])
+
+    @property
+    def pmx(self):
+        return float(self.values[4])
 
     def __add__(self, other):
         """
         Add two emission objects
-        :param other: The other Emission object to add
-        :return: A new object whose emission values are the sum of both Emission object
+        :param other: The other EmissionVector object to add
+        :return: A new object whose emission values are the sum of both EmissionVector object
         """
-        return Emission(self.co2 + other.co2, self.co + other.co, self.nox + other.nox, self.hc + other.hc,
-                        self.pmx + other.pmx)
+        return EmissionVector.from_array(self.values + other.values)
+
+    def __iadd__(self, other):
+        """
+        Add in place the values of another emission object
+        :param other: The other EmissionVector object to add
+        :return: This object
+        """
+        self.values += other.values
+        return self
 
     def value(self):
         """
         :return: The sum of all emissions
         """
-        return self.co2 + self.co + self.nox + self.hc + self.pmx
+        return float(self.values.dot(_ALL_POLLUTANTS))
 
     def __repr__(self) -> str:
         """
-        :return: The Emission string representation
+        :return: The EmissionVector string representation
         """
         repr = f'Emission(co2={self.co2},co={self.co},nox={self.nox},hc={self.hc},pmx={self.pmx})'
         return str(repr)
 
 
+"""
+Weights used to sum all pollutants
+"""
+_ALL_POLLUTANTS = np.ones(len(POLLUTANTS))
+
+"""
+Emission is kept as the name of the emission type
+"""
+Emission = EmissionVector
+
+
 class Area:
     """
     The Area class defines a grid area of the simulation map
@@ -160,12 +311,39 @@ class Area:
         self.weight_adjusted = False
         self.rectangle = Polygon(coords)
         self.name = name
-        self.emissions_by_step = []
+        self.emissions_by_step = np.zeros((0, len(POLLUTANTS)))
         self._lanes: Set[Lane] = set()
         self._tls: Set[TrafficLight] = set()
+        self.lane_indexes: List[int] = []
+        self.tl_indexes: List[int] = []
+
+    def __getstate__(self):
+        """
+        Lanes and traffic lights are not saved with the area,
+        which references them by index into the tables of the Data instance
+        :return: The state of the area
+        """
+        state = self.__dict__.copy()
+        del state['_lanes'], state['_tls']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the state of an area, lanes and traffic lights being linked back by the Data instance
+        :param state: The state of the area
+        """
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_lanes', set())
+        self.__dict__.setdefault('_tls', set())
 
-    def set_window_size(self, window_size):
-        self.window = collections.deque(maxlen=window_size)
+    def set_emissions_store(self, store, index):
+        """
+        Bind the area to the emissions store of the simulation
+        :param store: The EmissionStore instance
+        :param index: The index of the area in the store
+        :return:
+        """
+        self.emissions_by_step = store.area_emissions(index)
         
     def __eq__(self, other):
         """
@@ -223,26 +401,10 @@ class Area:
 
     def sum_all_emissions(self):
         """
-        Sum all Emissions object from initial step to final step
-        :return: The sum Emission object
+        Sum all emissions from initial step to final step
+        :return: The sum EmissionVector object
         """
-        sum = Emission()
-        for emission in self.emissions_by_step:
-            sum += emission
-        return sum
-
-    def sum_emissions_into_window(self, current_step):
-        """
-        Sum all Emissions object into the acquisition window
-        :param current_step: The current step of the simulation
-        :return:
-        """
-        self.window.appendleft(self.emissions_by_step[current_step].value())
-
-        sum = 0
-        for i in range(self.window.__len__()):
-            sum += self.window[i]
-        return sum
+        return EmissionVector.from_array(self.emissions_by_step.sum(axis=0))
 
     @classmethod
     def from_bounds(cls, xmin, ymin, xmax, ymax):
@@ -0,0 +1,230 @@
+"""
+This module reads the network data of a simulation directly from its net file, without launching SUMO,
+and caches the network data extracted from a net file
+"""
+
+import hashlib
+import os
+from typing import Dict, List
+from xml.etree import ElementTree
+
+import numpy as np
+from shapely.geometry import LineString
+
+import dumpfile
+from model import Lane, Logic, Phase, TrafficLight, create_sumo_logic
+
+"""
+Traffic light types of the net file, with their TraCI value
+"""
+TL_TYPES = {
+    'static': 0,
+    'actuated': 3,
+    'delay_based': 5
+}
+
+
+def get_net_file(sumocfg):
+    """
+    Find the net file of a simulation from its SUMO configuration file
+    :param sumocfg: The path to the .sumocfg file
+    :return: The path to the net file
+    """
+    root = ElementTree.parse(sumocfg).getroot()
+    net_file = root.find('input/net-file').get('value')
+    return os.path.join(os.path.dirname(sumocfg), net_file)
+
+
+def parse_shape(shape):
+    """
+    :param shape: A shape attribute of the net file ("x1,y1 x2,y2 ...")
+    :return: The list of (x, y) points
+    """
+    return [tuple(float(coord) for coord in point.split(',')) for point in shape.split()]
+
+
+def hash_net_file(path):
+    """
+    :param path: The path to the net file
+    :return: The SHA-256 hex digest of the net file content
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+"""
+Version of the cached networks, to increase when the content of the extracted networks changes
+"""
+CACHE_VERSION = 1
+
+"""
+Modes of extraction of a network : from the net file only, or through TraCI,
+which adds the traffic lights programs of the additional files of the .sumocfg
+"""
+EXTRACTION_MODES = ('offline', 'traci')
+
+
+def network_key(path, mode):
+    """
+    :param path: The path to the net file
+    :param mode: The extraction mode of the network, see EXTRACTION_MODES
+    :return: The SHA-256 hex digest identifying the extracted network into the cache
+    """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f'Unknown extraction mode {mode}, available modes : {", ".join(EXTRACTION_MODES)}')
+    key = f'{CACHE_VERSION}:{dumpfile.VERSION}:{mode}:{hash_net_file(path)}'
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class Network:
+    """
+    The Network class holds the data of a road network needed to create a dump, independently of the grid :
+    the network boundary, the lanes, the traffic lights and the traffic lights controlling each lane
+    """
+
+    def __init__(self, map_bounds=None, lanes=None, tls=None, lanes_tls=None):
+        """
+        Network constructor
+        :param map_bounds: The bounds of the network ((xmin, ymin), (xmax, ymax))
+        :param lanes: The list of Lane objects
+        :param tls: The dictionary associating a traffic light ID with its TrafficLight object
+        :param lanes_tls: The dictionary associating a lane ID with the IDs of traffic lights controlling it
+        """
+        self.map_bounds = map_bounds
+        self.lanes: List[Lane] = lanes if lanes is not None else []
+        self.tls: Dict[str, TrafficLight] = tls if tls is not None else {}
+        self.lanes_tls: Dict[str, List[str]] = lanes_tls if lanes_tls is not None else {}
+
+
+class NetFile(Network):
+    """
+    The NetFile class reads lanes, traffic lights and the network boundary of a net file.
+    The file is parsed in a streaming way, each element being freed as soon as it has been read.
+    """
+
+    def __init__(self, path):
+        """
+        NetFile constructor
+        :param path: The path to the .net.xml file
+        """
+        super().__init__()
+        self.path = path
+
+    def read(self):
+        """
+        Read the net file
+        :return: This NetFile instance
+        """
+        context = ElementTree.iterparse(self.path, events=('start', 'end'))
+        _, root = next(context)
+
+        for event, element in context:
+            if event != 'end':
+                continue
+
+            if element.tag == 'location':
+                xmin, ymin, xmax, ymax = (float(v) for v in element.get('convBoundary').split(','))
+                self.map_bounds = ((xmin, ymin), (xmax, ymax))
+            elif element.tag == 'lane':
+                self.lanes.append(Lane(element.get('id'), LineString(parse_shape(element.get('shape'))),
+                                       float(element.get('speed'))))
+            elif element.tag == 'tlLogic':
+                self.add_logic(element)
+            elif element.tag == 'connection' and element.get('tl') is not None:
+                lane_id = f'{element.get("from")}_{element.get("fromLane")}'
+                tl_ids = self.lanes_tls.setdefault(lane_id, [])
+                if element.get('tl') not in tl_ids:
+                    tl_ids.append(element.get('tl'))
+
+            if element.tag in ('location', 'edge', 'tlLogic', 'connection', 'junction'):
+                root.clear()  # Free the elements already read
+
+        # Traffic lights without program in the net file (rail crossings) are built by SUMO at runtime
+        for lane_id, tl_ids in self.lanes_tls.items():
+            self.lanes_tls[lane_id] = [tl_id for tl_id in tl_ids if tl_id in self.tls]
+        return self
+
+    def add_logic(self, element):
+        """
+        Add a traffic light logic read from a tlLogic element
+        :param element: The tlLogic element
+        """
+        phases = []
+        for phase in element.iter('phase'):
+            duration = float(phase.get('duration'))
+            min_duration = float(phase.get('minDur', duration))
+            max_duration = float(phase.get('maxDur', duration))
+            phases.append(Phase(duration, min_duration, max_duration, phase.get('state')))
+
+        sumo_logic = create_sumo_logic(element.get('programID'), TL_TYPES.get(element.get('type'), 0),
+                                       [phase.to_sumo() for phase in phases])
+        tl_id = element.get('id')
+        if tl_id not in self.tls:
+            self.tls[tl_id] = TrafficLight(tl_id, [])
+        self.tls[tl_id]._logics.append(Logic(sumo_logic, phases))
+
+
+class NetworkCache:
+    """
+    The NetworkCache class stores the networks extracted from net files into a cache directory.
+    Each network is saved in the binary dump format under a key made of the SHA-256 digest of its net file,
+    its extraction mode and the cache format version (see network_key),
+    so that a network is extracted only once whatever the grid of the dumps created from it.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        NetworkCache constructor
+        :param cache_dir: The cache directory
+        """
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        """
+        :param key: The key of a network, see network_key
+        :return: The path to the cached network
+        """
+        return os.path.join(self.cache_dir, f'{key}.dump')
+
+    def load(self, key):
+        """
+        :param key: The key of a network, see network_key
+        :return: The cached Network instance, or None if the network is not in the cache
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+
+        meta, arrays = dumpfile.read(path)
+        lanes = dumpfile.lanes_from_arrays(arrays)
+        tls = dumpfile.tls_from_arrays(arrays)
+        lanes_tls = {}
+        for lane_index, tl_index in zip(arrays['lanes_tls_lanes'].tolist(), arrays['lanes_tls_tls'].tolist()):
+            lanes_tls.setdefault(lanes[lane_index].lane_id, []).append(tls[tl_index].tl_id)
+        map_bounds = tuple(tuple(point) for point in meta['map_bounds'])
+        return Network(map_bounds, lanes, {tl.tl_id: tl for tl in tls}, lanes_tls)
+
+    def save(self, key, network):
+        """
+        Save a network into the cache
+        :param key: The key of the network, see network_key
+        :param network: The Network instance
+        :return: The path to the cached network
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        tls = list(network.tls.values())
+        tl_indexes = {tl.tl_id: index for index, tl in enumerate(tls)}
+        pairs = [(lane_index, tl_indexes[tl_id]) for lane_index, lane in enumerate(network.lanes)
+                 for tl_id in network.lanes_tls.get(lane.lane_id, []) if tl_id in tl_indexes]
+        pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+        arrays = {**dumpfile.lanes_to_arrays(network.lanes), **dumpfile.tls_to_arrays(tls),
+                  'lanes_tls_lanes': pairs[:, 0], 'lanes_tls_tls': pairs[:, 1]}
+        path = self.path(key)
+        dumpfile.write(path, {'map_bounds': network.map_bounds}, arrays)
+        return path
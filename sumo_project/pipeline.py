@@ -0,0 +1,102 @@
+"""
+This module overlaps the simulation steps of SUMO with the processing of their data :
+the main thread runs SUMO and reads the raw data of each step, a worker thread aggregates them into the areas,
+updates the window and exports them, while SUMO already runs the next step
+"""
+
+import queue
+import threading
+
+import emissions
+
+
+def fetch_step(p):
+    """
+    Read the raw data of the last step from SUMO, must be called from the thread controlling SUMO
+    :param p: The current process
+    :return: The raw data of the step
+    """
+    if p.config.lane_aggregation_mode:
+        return emissions.fetch_lanes_emissions()
+    return p.registry.fetch()
+
+
+def process_step(p, step, raw):
+    """
+    Aggregate the raw data of a step into the areas, store them, add them into the window and export them
+    :param p: The current process
+    :param step: The simulation step
+    :param raw: The raw data of the step, see fetch_step
+    :return: The emissions into the window for each area if the areas are evaluated at this step, None otherwise
+    """
+    if p.config.lane_aggregation_mode:
+        areas_emissions = emissions.sum_lanes_emissions(p, raw)
+    else:
+        p.registry.apply(raw)
+        areas_emissions = p.registry.sum_by_area(p.data)
+    windows_emissions = emissions.acquire_emissions(p, areas_emissions, step)
+    if p.exporter is not None:
+        p.exporter.add_step(step, areas_emissions)
+    return windows_emissions
+
+
+class StepPipeline(threading.Thread):
+    """
+    The StepPipeline class processes the steps submitted by the main thread in order, on a worker thread.
+    The results are read back by the main thread, which acts on the areas : the actions decided from the data
+    of the step N are applied after reading the step N + 1 and before running the step N + 2,
+    whatever the speed of both threads, so that the simulation remains deterministic.
+    """
+
+    def __init__(self, p):
+        """
+        StepPipeline constructor
+        :param p: The current process
+        """
+        threading.Thread.__init__(self, name='step_pipeline', daemon=True)
+        self.p = p
+        self.pending = 0
+        self._steps = queue.Queue()
+        self._results = queue.Queue()
+
+    def run(self):
+        """
+        Process the submitted steps until the pipeline is stopped
+        """
+        while True:
+            item = self._steps.get()
+            if item is None:
+                return
+            try:
+                self._results.put((process_step(self.p, *item), None))
+            except BaseException as e:
+                self._results.put((None, e))
+                return
+
+    def submit(self, step, raw):
+        """
+        Send the raw data of a step to the worker thread
+        :param step: The simulation step
+        :param raw: The raw data of the step, see fetch_step
+        """
+        self.pending += 1
+        self._steps.put((step, raw))
+
+    def result(self):
+        """
+        Wait for the processing of the oldest submitted step
+        :return: The emissions into the window for each area if the areas are evaluated at this step, None otherwise
+        """
+        windows_emissions, error = self._results.get()
+        self.pending -= 1
+        if error is not None:
+            raise error
+        return windows_emissions
+
+    def stop(self):
+        """
+        Stop the worker thread once the submitted steps are processed
+        """
+        if self.is_alive():
+            self._steps.put(None)
+            self.join()
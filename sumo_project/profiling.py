@@ -0,0 +1,165 @@
+"""
+This module measures where the time of a simulation is spent : the duration of each phase of every step,
+and optionally the stacks of the simulation thread sampled at regular intervals
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+"""
+Phases of a simulation step, in the order they are run
+"""
+PHASES = ('simulation_step', 'collect', 'window', 'actions', 'export', 'other')
+
+"""
+Edges of the histograms of the phases durations in seconds, 4 bins per decade from 1 µs to 10 s
+"""
+HISTOGRAM_EDGES = np.logspace(-6, 1, 29)
+
+
+class PhaseTimer:
+    """
+    The PhaseTimer class records the duration of each phase of every step into a preallocated (steps, phases) array.
+    A step is started with start(), and each phase is timed from the end of the previous one with lap(),
+    so that only one clock read is needed for each phase.
+    """
+
+    def __init__(self, n_steps, phases=PHASES):
+        """
+        PhaseTimer constructor
+        :param n_steps: The number of steps of the simulation
+        :param phases: The names of the phases
+        """
+        self.phases = phases
+        self.indexes = {phase: index for index, phase in enumerate(phases)}
+        self.durations = np.zeros((n_steps, len(phases)))
+        self.step = 0
+        self._last = 0.0
+
+    def start(self, step):
+        """
+        Start the timing of a step
+        :param step: The simulation step
+        """
+        self.step = step
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """
+        End a phase of the current step
+        :param phase: The name of the phase
+        """
+        now = time.perf_counter()
+        self.durations[self.step, self.indexes[phase]] += now - self._last
+        self._last = now
+
+    def summary(self, first_step, last_step):
+        """
+        :param first_step: The first step timed
+        :param last_step: The step following the last step timed
+        :return: A dictionary giving for each phase its total duration, its share of the step duration,
+        the mean, median, 95th and 99th percentiles and maximum of its durations, and their histogram
+        """
+        durations = self.durations[first_step:last_step]
+        total = durations.sum()
+        summary = {'steps': int(last_step - first_step), 'total': float(total),
+                   'histogram_edges': HISTOGRAM_EDGES.tolist(), 'phases': {}}
+        for phase, phase_durations in zip(self.phases, durations.T):
+            phase_durations = phase_durations if len(phase_durations) else np.zeros(1)
+            summary['phases'][phase] = {
+                'total': float(phase_durations.sum()),
+                'share': float(phase_durations.sum() / total * 100) if total else 0.0,
+                'mean': float(phase_durations.mean()),
+                'p50': float(np.percentile(phase_durations, 50)),
+                'p95': float(np.percentile(phase_durations, 95)),
+                'p99': float(np.percentile(phase_durations, 99)),
+                'max': float(phase_durations.max()),
+                'histogram': np.histogram(phase_durations, HISTOGRAM_EDGES)[0].tolist()
+            }
+        return summary
+
+    def save(self, path, first_step, last_step):
+        """
+        Save the summary into a JSON file and the durations of every step into a CSV file
+        :param path: The path to the profile, without extension
+        :param first_step: The first step timed
+        :param last_step: The step following the last step timed
+        :return: The summary, see summary()
+        """
+        summary = self.summary(first_step, last_step)
+        with open(f'{path}.json', 'w') as f:
+            json.dump(summary, f, indent=4)
+
+        steps = np.arange(first_step, last_step)
+        rows = np.column_stack((steps, self.durations[first_step:last_step]))
+        np.savetxt(f'{path}.csv', rows, fmt=['%d'] + ['%.9f'] * len(self.phases), delimiter=',',
+                   header=','.join(('step',) + self.phases), comments='')
+        return summary
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    The SamplingProfiler class is a thread sampling the stack of another thread at regular intervals,
+    the samples being counted by stack in the collapsed format of flame graph tools
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        """
+        SamplingProfiler constructor
+        :param thread_id: The identifier of the sampled thread
+        :param interval: The sampling interval in seconds
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """
+        Sample the stack of the thread until the profiler is stopped
+        """
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """
+        Stop the sampling and wait for the thread
+        """
+        self._stop_event.set()
+        self.join()
+
+    def top_functions(self, count=10):
+        """
+        :param count: The number of functions
+        :return: The functions running most often, as (function, share of the samples) pairs
+        """
+        samples = sum(self.stacks.values())
+        functions = collections.Counter()
+        for stack, stack_samples in self.stacks.items():
+            functions[stack.rsplit(';', 1)[-1]] += stack_samples
+        return [(function, function_samples / samples * 100) for function, function_samples
+                in functions.most_common(count)]
+
+    def save(self, path):
+        """
+        Save the sampled stacks in the collapsed format, one stack and its number of samples by line
+        :param path: The path to the stacks file
+        """
+        with open(path, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f'{stack} {samples}\n')
@@ -0,0 +1,113 @@
+"""
+This module caches the results of the reference simulations (without actions),
+so that they are run only once and the reduction of emissions of the other simulations is computed against them
+"""
+
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import emissions
+from netfile import hash_net_file
+
+
+def get_simulation_files(sumocfg):
+    """
+    :param sumocfg: The path to the SUMO configuration file
+    :return: The paths to the configuration file and to its input files (network, routes, additional files)
+    """
+    sumocfg_dir = os.path.dirname(sumocfg)
+    files = [sumocfg]
+    input_node = ET.parse(sumocfg).getroot().find('input')
+    if input_node is not None:
+        for node in input_node:
+            for value in node.get('value', '').replace(',', ' ').split():
+                files.append(os.path.join(sumocfg_dir, value))
+    return files
+
+
+def reference_key(data, config):
+    """
+    Build the key of the reference simulation of a configuration, from all the inputs its results depend on :
+    the areas of the dump, the SUMO configuration and input files, the number of steps, the window size,
+    the seed and the emissions aggregation mode
+    :param data: The Data instance
+    :param config: The Config instance
+    :return: The SHA-256 hex digest of the inputs
+    """
+    inputs = {
+        'areas': [[area.name, list(area.rectangle.bounds), len(area._lanes)] for area in data.grid],
+        'files': [hash_net_file(path) for path in get_simulation_files(config._SUMOCFG)],
+        'n_steps': config.n_steps,
+        'window_size': config.window_size,
+        'seed': config.seed,
+        'lane_aggregation_mode': config.lane_aggregation_mode
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class ReferenceCache:
+    """
+    The ReferenceCache class stores the emissions of each area for every step of the reference simulations
+    into a cache directory, under the key of their inputs
+    """
+
+    def __init__(self, cache_dir):
+        """
+        ReferenceCache constructor
+        :param cache_dir: The cache directory
+        """
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        """
+        :param key: The key of a reference simulation
+        :return: The path to the cached results
+        """
+        return os.path.join(self.cache_dir, f'{key}.npz')
+
+    def load(self, key):
+        """
+        :param key: The key of a reference simulation
+        :return: The (steps, areas, pollutants) array of emissions, or None if the reference is not in the cache
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as reference:
+            return reference['emissions']
+
+    def save(self, key, store):
+        """
+        Save the results of a reference simulation into the cache,
+        the file being replaced at once since several simulations can save the same reference
+        :param key: The key of the reference simulation
+        :param store: The EmissionStore instance of the simulation
+        :return: The path to the cached results
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        path = self.path(key)
+        tmp_path = os.path.join(self.cache_dir, f'{key}.{os.getpid()}.tmp.npz')
+        np.savez(tmp_path, emissions=store.emissions, total=store.total())
+        os.replace(tmp_path, path)
+        return path
+
+
+def add_reductions(jobs, cache):
+    """
+    Add the reduction percentage of total emissions against the cached reference to the results
+    of the simulations with actions
+    :param jobs: The list of jobs
+    :param cache: The ReferenceCache instance
+    """
+    for job in jobs:
+        if job.status != 'done' or job.result.get('reference', True):
+            continue
+        reference = cache.load(job.result['reference_key'])
+        if reference is not None:
+            job.result['reduction'] = emissions.get_reduction_percentage(reference.sum(), job.result['total'])
@@ -0,0 +1,194 @@
+"""
+This module keeps track of the vehicles of the simulation
+"""
+
+import traci
+from traci import constants as tc
+
+import numpy as np
+
+from model import EmissionVector, POLLUTANTS
+
+"""
+Variables subscribed for each vehicle in subscription mode : position and pollutant emissions
+"""
+VEHICLE_VARIABLES = (tc.VAR_POSITION, tc.VAR_CO2EMISSION, tc.VAR_COEMISSION, tc.VAR_NOXEMISSION,
+                     tc.VAR_HCEMISSION, tc.VAR_PMXEMISSION)
+
+
+class VehicleRegistry:
+    """
+    The VehicleRegistry class tracks the vehicles incrementally from the departed and arrived lists.
+    Each live vehicle owns a slot into the positions and emissions arrays,
+    and its static attributes (vehicle class, emission class) are fetched once on departure.
+    """
+
+    def __init__(self, subscription_mode: bool = True, capacity: int = 1024):
+        """
+        VehicleRegistry constructor
+        :param subscription_mode: If True, the vehicles are subscribed to their position and emissions,
+        otherwise they are polled at each step
+        :param capacity: The initial number of slots
+        """
+        self.subscription_mode = subscription_mode
+        self.slots = {}
+        self._free_slots = list(reversed(range(capacity)))
+
+        self.positions = np.zeros((capacity, 2))
+        self.emissions = np.zeros((capacity, len(POLLUTANTS)))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.vehicle_classes = np.zeros(capacity, dtype=np.int64)
+        self.emission_classes = [None] * capacity
+
+        self.class_names = []
+        self.class_emissions = None
+
+    def _grow(self):
+        """
+        Double the number of slots
+        """
+        capacity = len(self.alive)
+        self._free_slots = list(reversed(range(capacity, 2 * capacity)))
+        self.positions = np.concatenate((self.positions, np.zeros_like(self.positions)))
+        self.emissions = np.concatenate((self.emissions, np.zeros_like(self.emissions)))
+        self.alive = np.concatenate((self.alive, np.zeros_like(self.alive)))
+        self.vehicle_classes = np.concatenate((self.vehicle_classes, np.zeros_like(self.vehicle_classes)))
+        self.emission_classes.extend([None] * capacity)
+
+    def _class_index(self, vehicle_class):
+        """
+        :param vehicle_class: The SUMO vehicle class (passenger, bus, truck...)
+        :return: The index of the vehicle class into the breakdown
+        """
+        if vehicle_class not in self.class_names:
+            self.class_names.append(vehicle_class)
+        return self.class_names.index(vehicle_class)
+
+    def register(self, veh_id):
+        """
+        Register a new vehicle and cache its static attributes
+        :param veh_id: The vehicle ID
+        """
+        self._add(veh_id, traci.vehicle.getVehicleClass(veh_id), traci.vehicle.getEmissionClass(veh_id))
+        if self.subscription_mode:
+            traci.vehicle.subscribe(veh_id, VEHICLE_VARIABLES)
+
+    def _add(self, veh_id, vehicle_class, emission_class):
+        """
+        Give a slot to a new vehicle
+        :param veh_id: The vehicle ID
+        :param vehicle_class: The SUMO vehicle class
+        :param emission_class: The SUMO emission class
+        """
+        if not self._free_slots:
+            self._grow()
+        slot = self._free_slots.pop()
+        self.slots[veh_id] = slot
+        self.alive[slot] = True
+        self.vehicle_classes[slot] = self._class_index(vehicle_class)
+        self.emission_classes[slot] = emission_class
+
+    def unregister(self, veh_id):
+        """
+        Release the slot of a vehicle which left the simulation
+        :param veh_id: The vehicle ID
+        """
+        slot = self.slots.pop(veh_id, None)
+        if slot is not None:
+            self.alive[slot] = False
+            self.emissions[slot] = 0
+            self.emission_classes[slot] = None
+            self._free_slots.append(slot)
+
+    def register_all(self):
+        """
+        Register all vehicles currently in the simulation, useful when a simulation state has been loaded
+        """
+        for veh_id in traci.vehicle.getIDList():
+            if veh_id not in self.slots:
+                self.register(veh_id)
+
+    def update(self):
+        """
+        Follow the departed and arrived vehicles of the last step and read the vehicles data
+        """
+        self.apply(self.fetch())
+
+    def fetch(self):
+        """
+        Read the vehicles data of the last step from SUMO, without changing the registry,
+        so that they can be applied by another thread while SUMO runs the next step
+        :return: The arrived vehicles, the departed vehicles with their vehicle and emission classes,
+        and the position and emissions of each vehicle
+        """
+        arrived = traci.simulation.getArrivedIDList()
+        departed = []
+        for veh_id in traci.simulation.getDepartedIDList():
+            departed.append((veh_id, traci.vehicle.getVehicleClass(veh_id), traci.vehicle.getEmissionClass(veh_id)))
+            if self.subscription_mode:
+                traci.vehicle.subscribe(veh_id, VEHICLE_VARIABLES)
+
+        if self.subscription_mode:
+            # The results of TraCI are cleared at the next step
+            results = dict(traci.vehicle.getAllSubscriptionResults())
+        else:
+            results = {veh_id: dict(zip(VEHICLE_VARIABLES, (
+                traci.vehicle.getPosition(veh_id), traci.vehicle.getCO2Emission(veh_id),
+                traci.vehicle.getCOEmission(veh_id), traci.vehicle.getNOxEmission(veh_id),
+                traci.vehicle.getHCEmission(veh_id), traci.vehicle.getPMxEmission(veh_id))))
+                for veh_id in traci.vehicle.getIDList()}
+        return arrived, departed, results
+
+    def apply(self, step_data):
+        """
+        Follow the departed and arrived vehicles and store the vehicles data of a step
+        :param step_data: The vehicles data of the step, see fetch()
+        """
+        arrived, departed, results = step_data
+        for veh_id in arrived:
+            self.unregister(veh_id)
+        for veh_id, vehicle_class, emission_class in departed:
+            self._add(veh_id, vehicle_class, emission_class)
+
+        for veh_id, values in results.items():
+            slot = self.slots.get(veh_id)
+            if slot is not None:
+                self.positions[slot] = values[tc.VAR_POSITION]
+                self.emissions[slot] = [values[variable] for variable in VEHICLE_VARIABLES[1:]]
+
+    def sum_by_area(self, data):
+        """
+        Sum the emissions of the live vehicles into the area containing them,
+        and add them to the vehicle class breakdown of the areas
+        :param data: The Data instance
+        :return: The array of emissions with shape (areas, pollutants)
+        """
+        slots = np.flatnonzero(self.alive)
+        positions = self.positions[slots]
+        emissions = self.emissions[slots]
+
+        n_areas = len(data.grid)
+        if self.class_emissions is None:
+            self.class_emissions = np.zeros((n_areas, len(self.class_names), len(POLLUTANTS)))
+        elif self.class_emissions.shape[1] < len(self.class_names):
+            missing = len(self.class_names) - self.class_emissions.shape[1]
+            self.class_emissions = np.concatenate(
+                (self.class_emissions, np.zeros((n_areas, missing, len(POLLUTANTS)))), axis=1)
+
+        indexes = data.locate(positions[:, 0], positions[:, 1])
+        inside = indexes >= 0
+        np.add.at(self.class_emissions, (indexes[inside], self.vehicle_classes[slots][inside]), emissions[inside])
+
+        areas_emissions = np.zeros((n_areas, len(POLLUTANTS)))
+        np.add.at(areas_emissions, indexes[inside], emissions[inside])
+        return areas_emissions
+
+    def classes_total(self):
+        """
+        :return: A dictionary associating each vehicle class with the EmissionVector
+        of its emissions over all areas
+        """
+        if self.class_emissions is None:
+            return {}
+        totals = self.class_emissions.sum(axis=0)
+        return {name: EmissionVector.from_array(totals[index]) for index, name in enumerate(self.class_names)}
@@ -3,22 +3,35 @@ This module defines the entry point of the application
 """
 
 import argparse
-import csv
 import datetime
-import itertools
 import logging
+import logging.handlers
 import multiprocessing
 import os
+import queue
 import sys
+import threading
 import time
 import traci
 
-import jsonpickle
-
+import backend
+import checkpoint
 from config import Config
+from control import ControlLag
 from data import Data
+from export import EXPORTERS
+import dumpfile
 import emissions
-from model import Emission
+from netfile import NetFile, NetworkCache, get_net_file, network_key
+from model import EmissionVector, POLLUTANTS
+from pipeline import StepPipeline, fetch_step
+from profiling import PhaseTimer, SamplingProfiler
+import reference
+from registry import VehicleRegistry
+from scheduler import Scheduler, exit_on_terminate, print_summary
+import sweep
+from store import EmissionStore
+from window import create_window
 
 
 """
@@ -35,19 +48,45 @@ class RunProcess(multiprocessing.Process):
     Run process inheriting from multiprocessing.Process
     """
     
-    def __init__(self, data: Data, config: Config, save_logs: bool, csv_export: bool):
+    def __init__(self, data: Data, config: Config, save_logs: bool, csv_export: bool, result_queue=None,
+                 dump_path=None, export_format='csv', resume=False, snapshot_dir=None, save_snapshot=False,
+                 reference_cache=None, profile=False):
         """
         RunProcess constructor
-        :param data: The data instance
+        :param data: The data instance, None if dump_path is given, the data being loaded by the process
         :param config: The config instance
         :param save_logs: If save_logs == True, it will save the logs into the logs directory 
-        :param csv_export: If csv_export == True, it will export all emissions data into a csv file 
+        :param csv_export: If csv_export == True, it will export all emissions data while the simulation is running
+        :param result_queue: A multiprocessing queue receiving the results of the simulation, if not None
+        :param dump_path: The path to the binary dump of data, if not None the process attaches to it
+        as a memory-mapped file shared with the other processes, instead of using its own copy of data
+        :param export_format: The format of the export, 'csv' or 'npz'
+        :param resume: If resume == True, the simulation continues from its last checkpoint
+        :param snapshot_dir: The directory of the warm-up snapshot, if not None the simulation starts from it
+        :param save_snapshot: If save_snapshot == True, the state at the end of the simulation is saved
+        as the warm-up snapshot into snapshot_dir, instead of starting from it
+        :param reference_cache: The ReferenceCache instance, if not None a reference simulation is loaded
+        from the cache when it has already been run, and saved into the cache otherwise
+        :param profile: If profile == True, the stacks of the simulation loop are sampled and saved into
+        the logs directory with the phases durations
         """
         multiprocessing.Process.__init__(self)
         self.data = data 
         self.config = config
         self.save_logs = save_logs
         self.csv_export = csv_export
+        self.result_queue = result_queue
+        self.dump_path = dump_path
+        self.export_format = export_format
+        self.exporter = None
+        self.resume = resume
+        self.snapshot_dir = snapshot_dir
+        self.save_snapshot = save_snapshot
+        self.reference_cache = reference_cache
+        self.reference_key = None
+        self.profile = profile
+        self.profiler = None
+        self.log_listener = None
         
     def init_logger(self):
         """
@@ -76,43 +115,116 @@ class RunProcess(multiprocessing.Process):
         handler = logging.StreamHandler()
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
+
+        if self.config.pipeline_mode:
+            # The records are written by a listener thread, the steps loop only puts them into a queue
+            self.log_listener = logging.handlers.QueueListener(queue.SimpleQueue(), *self.logger.handlers)
+            self.logger.handlers = [logging.handlers.QueueHandler(self.log_listener.queue)]
+            self.logger.propagate = False
+            self.log_listener.start()
+
+    def init_store(self):
+        """
+        Init the emissions store of the simulation, memory-mapped into the store directory
+        if the store_mmap_mode is chosen
+        """
+        filename = None
+        if self.config.store_mmap_mode:
+            store_dir = f'{self.data.dir}/store'
+            if not os.path.exists(store_dir):
+                os.mkdir(store_dir)
+
+            now = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+            conf_name = self.config.config_filename.replace('.json', '')
+            filename = os.path.join(store_dir, f'{self.data.dump_name}_{conf_name}_{now}.npy')
+
+        self.store = EmissionStore(self.config.n_steps, len(self.data.grid), filename)
+        for index, area in enumerate(self.data.grid):
+            area.set_emissions_store(self.store, index)
         
-    def export_data_to_csv(self):
+    def init_exporter(self):
         """
-        Export all Emission objects as a CSV file into the csv directory
+        Init the exporter writing the emissions by batches of steps while the simulation is running,
+        into the directory named by the export format
         """
-        csv_dir = f'{self.data.dir}/csv'
-        if not os.path.exists(csv_dir):
-            os.mkdir(csv_dir)
+        exporter_class = EXPORTERS[self.export_format]
+        export_dir = f'{self.data.dir}/{exporter_class.extension}'
+        if not os.path.exists(export_dir):
+            os.mkdir(export_dir)
     
         now = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
         conf_name = self.config.config_filename.replace('.json', '')
 
-        csvfile = os.path.join(csv_dir, f'{self.data.dump_name}_{conf_name}_{now}.csv')
-        with open(csvfile, 'w') as f:
-            writer = csv.writer(f)
-            # Write CSV headers
-            writer.writerow(itertools.chain(('Step',), (a.name for a in self.data.grid)))
-            # Write all areas emission value for each step
-            for step in range(self.config.n_steps):
-                em_for_step = (f'{a.emissions_by_step[step].value():.3f}' for a in self.data.grid)
-                writer.writerow(itertools.chain((step,), em_for_step))
+        path = os.path.join(export_dir, f'{self.data.dump_name}_{conf_name}_{now}')
+        if exporter_class.extension == 'csv':
+            path += '.csv'
+        self.exporter = exporter_class(path, (area.name for area in self.data.grid), self.config.export_batch_size)
+    
+    def save_profile(self, first_step, step):
+        """
+        Save the durations of the phases of the steps simulated into the logs directory,
+        as a JSON summary with histograms and a CSV file of every step, and the sampled stacks if any
+        :param first_step: The first step simulated
+        :param step: The step following the last step simulated
+        """
+        now = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+        conf_name = self.config.config_filename.replace('.json', '')
+        path = os.path.join(self.data.dir, 'logs', f'{self.data.dump_name}_{conf_name}_{now}.profile')
+        
+        summary = self.timer.save(path, first_step, step)
+        for phase, phase_summary in summary['phases'].items():
+            self.logger.info(f'Phase {phase} : {phase_summary["share"]:.1f}% '
+                             f'(mean = {phase_summary["mean"] * 1000:.3f} ms, '
+                             f'p99 = {phase_summary["p99"] * 1000:.3f} ms)')
+        self.logger.info(f'Profile saved into {path}.json')
+        
+        if self.profiler is not None:
+            self.profiler.save(f'{path}.stacks.txt')
+            for function, share in self.profiler.top_functions():
+                self.logger.info(f'Sampled {function} : {share:.1f}%')
+            self.logger.info(f'Sampled stacks saved into {path}.stacks.txt')
         
     def run(self):
         """
         Launch a simulation, will be called when a RunProcess instance is started
         """
+        exit_on_terminate()
+        if self.dump_path is not None:
+            self.data = Data.load(self.dump_path, use_mmap=True)
+        self.init_logger()
+        self.init_store()
+        if self.csv_export:
+            self.init_exporter()
+        self.timer = PhaseTimer(self.config.n_steps)
+        self.logger.info(f'Running simulation dump "{self.data.dump_name}" with the config "{self.config.config_filename}" ...')  
+        
+        if self.reference_cache is not None:
+            self.reference_key = reference.reference_key(self.data, self.config)
+        if self.config.without_actions_mode:
+            self.logger.info('Reference simulation')
+            if self.load_reference():
+                return
+        
+        # Bound before SUMO starts, the cleanup reading them even if SUMO fails to start
+        start = time.perf_counter()
+        completed = False
+        pipeline = None
+        step = first_step = 0
         try:
-            self.init_logger()
-            self.logger.info(f'Running simulation dump "{self.data.dump_name}" with the config "{self.config.config_filename}" ...')  
-            
-            if self.config.without_actions_mode:
-                self.logger.info('Reference simulation')
+            sumo_cmd = self.config.sumo_cmd
+            if self.config.checkpoint_interval or self.snapshot_dir is not None:
+                sumo_cmd = sumo_cmd + checkpoint.SUMO_OPTIONS
+            backend.use_backend(self.config.backend)
+            self.logger.info(f'Backend : {self.config.backend}')
+            traci.start(sumo_cmd)
             
-            traci.start(self.config.sumo_cmd)
-            
-            for area in self.data.grid:  # Set acquisition window size 
-                area.set_window_size(self.config.window_size)
+            self.window = create_window(self.config, len(self.data.grid))  # Set acquisition window
+            self.control_lag = ControlLag(len(self.data.grid))
+            if self.config.lane_aggregation_mode:
+                emissions.subscribe_lanes(self)
+            else:
+                self.registry = VehicleRegistry(self.config.subscription_mode)
+            for area in self.data.grid:
                 traci.polygon.add(area.name, area.rectangle.exterior.coords, (255, 0, 0))  # Add polygon for UI
                 
             self.logger.info(f'Loaded simulation file : {self.config._SUMOCFG}')
@@ -120,44 +232,176 @@ class RunProcess(multiprocessing.Process):
             
             start = time.perf_counter()
             self.logger.info('Simulation started...')
-            step = 0
+            if self.resume:
+                step = first_step = checkpoint.restore_checkpoint(self)
+            if step == 0 and self.snapshot_dir is not None and not self.save_snapshot:
+                step = first_step = checkpoint.restore_checkpoint(self, self.snapshot_dir)
+            if self.profile:
+                self.profiler = SamplingProfiler(threading.get_ident())
+                self.profiler.start()
+            if self.config.pipeline_mode:
+                pipeline = StepPipeline(self)
+                pipeline.start()
+            progress_interval = max(1, self.config.n_steps // 100)
             while step < self.config.n_steps:
+                self.timer.start(step)
                 traci.simulationStep()
+                self.timer.lap('simulation_step')
         
-                vehicles = emissions.get_all_vehicles()
-                emissions.get_emissions(self, vehicles, step)
+                if pipeline is not None:
+                    pipeline.submit(step, fetch_step(self))
+                    self.timer.lap('collect')
+                    # Actions of the previous step, the worker processing the current one
+                    if pipeline.pending > 1:
+                        self.act_on_areas(pipeline.result())
+                    self.timer.lap('actions')
+                elif self.config.lane_aggregation_mode:
+                    areas_emissions = emissions.get_lanes_emissions(self)
+                else:
+                    self.registry.update()
+                    areas_emissions = self.registry.sum_by_area(self.data)
+                if pipeline is None:
+                    self.timer.lap('collect')
+                    windows_emissions = emissions.acquire_emissions(self, areas_emissions, step)
+                    self.timer.lap('window')
+                    if windows_emissions is not None:
+                        emissions.act_on_areas(self, windows_emissions)
+                    self.timer.lap('actions')
+                    if self.exporter is not None:
+                        self.exporter.add_step(step, areas_emissions)
+                    self.timer.lap('export')
                 step += 1
+                
+                interval = self.config.checkpoint_interval
+                if interval and step % interval == 0 and step < self.config.n_steps:
+                    self.drain(pipeline)
+                    checkpoint.save_checkpoint(self, step)
         
-                print(f'step = {step}/{self.config.n_steps}', end='\r')
+                if step % progress_interval == 0 or step == self.config.n_steps:
+                    print(f'step = {step}/{self.config.n_steps}', end='\r')
+                self.timer.lap('other')
+            
+            self.drain(pipeline)
+            if self.save_snapshot:
+                checkpoint.save_checkpoint(self, step, self.snapshot_dir)
+                self.logger.info(f'Warm-up snapshot saved into {self.snapshot_dir}')
+            if self.config.without_actions_mode and self.reference_cache is not None and first_step == 0:
+                path = self.reference_cache.save(self.reference_key, self.store)
+                self.logger.info(f'Reference saved into the cache : {path}')
+            completed = True
         
         finally:
-            traci.close(False)
-            
-            total_emissions = Emission()
-            for area in self.data.grid:
-                total_emissions += area.sum_all_emissions()
-                
-            self.logger.info(f'Total emissions = {total_emissions.value()} mg')
-            for pollutant in ['co2','co','nox','hc','pmx']:
-                value = total_emissions.__getattribute__(pollutant)
-                self.logger.info(f'{pollutant.upper()} = {value} mg')
-                
+            if pipeline is not None:
+                pipeline.stop()
+            if self.profiler is not None:
+                self.profiler.stop()
+            backend.close(traci)
             simulation_time = round(time.perf_counter() - start, 2)
-            self.logger.info(f'End of the simulation ({simulation_time}s)')
+            self.save_profile(first_step, step)
+            self.report(completed, step, step - first_step, simulation_time)
+    
+    def act_on_areas(self, windows_emissions):
+        """
+        Act on the areas evaluated at a step processed by the pipeline
+        :param windows_emissions: The emissions into the window for each area, None if the areas are not evaluated
+        """
+        if windows_emissions is not None:
+            emissions.act_on_areas(self, windows_emissions)
+    
+    def drain(self, pipeline):
+        """
+        Wait for the processing of the steps submitted to the pipeline and apply their actions,
+        so that the store, the window and the registry are up to date
+        :param pipeline: The step pipeline, None if the steps are processed by the main thread
+        """
+        while pipeline is not None and pipeline.pending:
+            self.act_on_areas(pipeline.result())
+    
+    def load_reference(self):
+        """
+        Load the emissions of the reference simulation from the cache, instead of running it
+        :return: True if the reference is in the cache
+        """
+        if self.reference_cache is None:
+            return False
+        cached_emissions = self.reference_cache.load(self.reference_key)
+        if cached_emissions is None:
+            return False
+        
+        self.logger.info(f'Reference loaded from the cache : {self.reference_cache.path(self.reference_key)}')
+        for step, areas_emissions in enumerate(cached_emissions):
+            self.store.add_step(step, areas_emissions)
+            if self.exporter is not None:
+                self.exporter.add_step(step, areas_emissions)
+        self.report(True, self.config.n_steps, 0, 0.0)
+        return True
+    
+    def report(self, completed, step, simulated_steps, simulation_time):
+        """
+        Log the total emissions of the simulation, close the export and send the results
+        :param completed: If completed == True, all the steps of the simulation have been run
+        :param step: The number of steps of the simulation reached
+        :param simulated_steps: The number of steps simulated by this process
+        :param simulation_time: The duration of the simulation in seconds
+        """
+        total_emissions = EmissionVector.from_array(self.store.total())
+        self.store.flush()
             
-            # 1 step is equal to one second simulated
-            self.logger.info(f'Real-time factor : {self.config.n_steps / simulation_time}')
+        self.logger.info(f'Total emissions = {total_emissions.value()} mg')
+        for pollutant in POLLUTANTS:
+            value = total_emissions[pollutant]
+            self.logger.info(f'{pollutant.upper()} = {value} mg')
+
+        registry = getattr(self, 'registry', None)
+        if registry is not None:
+            for vehicle_class, class_total in registry.classes_total().items():
+                self.logger.info(f'Total emissions of {vehicle_class} vehicles = {class_total.value()} mg')
             
-            if self.csv_export:
-                self.export_data_to_csv()
-                self.logger.info(f'Exported data into the csv folder')
+        control_lag = getattr(self, 'control_lag', None)
+        if control_lag is not None and self.config.control_period > 1:
+            self.logger.info(f'Control period of {self.config.control_period} steps : '
+                             f'{control_lag.mismatch_percentage():.2f}% of area-steps differ from a control '
+                             f'at every step, mean action latency = {control_lag.mean_latency():.2f} steps')
+        
+        self.logger.info(f'End of the simulation ({simulation_time}s)')
+        
+        # 1 step is equal to one second simulated
+        real_time_factor = simulated_steps / simulation_time if simulation_time else None
+        self.logger.info(f'Real-time factor : {real_time_factor}')
+        
+        if self.exporter is not None:
+            self.exporter.close()
+            self.logger.info(f'Exported data into {self.exporter.path}')
+        
+        if self.result_queue is not None:
+            self.result_queue.put({
+                'name': self.name,
+                'completed': completed,
+                'steps': step,
+                'simulated_steps': simulated_steps,
+                'total': total_emissions.value(),
+                'pollutants': {pollutant: total_emissions[pollutant] for pollutant in POLLUTANTS},
+                'simulation_time': simulation_time,
+                'real_time_factor': real_time_factor,
+                'reference': bool(self.config.without_actions_mode),
+                'reference_key': self.reference_key
+            })
+        if self.log_listener is not None:
+            self.log_listener.stop()
                 
-def create_dump(dump_name, simulation_dir, areas_number):
+def create_dump(dump_name, simulation_dir, areas_number, offline=False, processes=1, partition='grid',
+                max_depth=6, max_lanes=200):
     """
     Create a new dump with config file and dump_name chosen 
     :param dump_name: The name of the data dump
     :param simulation_dir: The simulation directory 
     :param areas_number: The number of areas in grid 
+    :param offline: If offline == True, data are read from the net file without launching SUMO.
+    In both cases, the network data are cached and the next dumps of the same network are created from the cache.
+    :param processes: The number of processes used to assign lanes to areas
+    :param partition: The partitioning of the map : a regular grid or an adaptive quadtree
+    :param max_depth: The maximum depth of the quadtree
+    :param max_lanes: The maximum number of lanes of a quadtree area, unless it is at the maximum depth
     :return:
     """
     
@@ -168,25 +412,55 @@ def create_dump(dump_name, simulation_dir, areas_number):
         if f.endswith('.sumocfg'):
             _SUMOCFG = os.path.join(simulation_dir, f)
             
-    sumo_binary = os.path.join(os.environ['SUMO_HOME'], 'bin', 'sumo')
-    sumo_cmd = [sumo_binary, "-c", _SUMOCFG]
-    
+    if os.path.isfile(f'{simulation_dir}/dump/{dump_name}.dump'):
+        print(f'Dump with name {dump_name} already exists')
+        return
+
+    start = time.perf_counter()
+    data = Data(dump_name, None, areas_number, simulation_dir)
+    net_file = get_net_file(_SUMOCFG)
+    key = network_key(net_file, 'offline' if offline else 'traci')
+    cache = NetworkCache(f'{simulation_dir}/dump/cache')
     
-    traci.start(sumo_cmd)
-    if not os.path.isfile(f'{simulation_dir}/dump/{dump_name}.json'):
-        start = time.perf_counter()
-        data = Data(dump_name, traci.simulation.getNetBoundary(), areas_number, simulation_dir)
-        data.init_grid()
-        data.add_data_to_areas() 
-        data.save()
-        
-        loading_time = round(time.perf_counter() - start, 2)
-        print(f'Data loaded ({loading_time}s)')
-        print(f'Dump {dump_name} created')
+    network = cache.load(key)
+    if network is not None:
+        print(f'Network loaded from the cache ({key[:12]})')
     else:
-        print(f'Dump with name {dump_name} already exists')
+        if offline:
+            network = NetFile(net_file).read()
+        else:
+            sumo_binary = os.path.join(os.environ['SUMO_HOME'], 'bin', 'sumo')
+            sumo_cmd = [sumo_binary, "-c", _SUMOCFG]
         
-    traci.close(False)  
+            traci.start(sumo_cmd)
+            network = data.get_network()
+            traci.close(False)
+        cache.save(key, network)
+    
+    data.map_bounds = network.map_bounds
+    if partition == 'quadtree':
+        data.init_quadtree(network.lanes, max_depth, max_lanes)
+    else:
+        data.init_grid()
+    data.add_net_data_to_areas(network, processes)
+    data.save()
+
+    loading_time = round(time.perf_counter() - start, 2)
+    print(f'Data loaded ({loading_time}s)')
+    print(f'Dump {dump_name} created with {len(data.grid)} areas')
+    
+def convert_dump(json_path):
+    """
+    Convert a JSON dump created by a former version into the binary dump format
+    :param json_path: The path to the JSON dump
+    :return:
+    """
+    start = time.perf_counter()
+    data = Data.load(json_path)
+    dump_path = data.save()
+    
+    conversion_time = round(time.perf_counter() - start, 2)
+    print(f'Dump {data.dump_name} converted into {dump_path} ({conversion_time}s)')
     
 def add_options(parser):
     """
@@ -201,6 +475,21 @@ def add_options(parser):
                         help='Will create a grid with "areas x areas" areas')
     parser.add_argument("-simulation_dir", "--simulation_dir", type=str,
                         help='Choose the simulation directory')
+    parser.add_argument("-offline", "--offline", action="store_true",
+                        help='Create the dump from the net file of the simulation, without launching SUMO')
+    parser.add_argument("-processes", "--processes", type=int, default=os.cpu_count(),
+                        help='Number of processes used to assign lanes to areas when creating a dump '
+                             '(default: number of CPUs)')
+    parser.add_argument("-partition", "--partition", type=str, choices=['grid', 'quadtree'], default='grid',
+                        help='Partition the map into a regular grid of "areas x areas" areas, '
+                             'or into an adaptive quadtree following the lanes density (default: grid)')
+    parser.add_argument("-max_depth", "--max_depth", type=int, default=6,
+                        help='Maximum depth of the quadtree partitioning (default: 6)')
+    parser.add_argument("-max_lanes", "--max_lanes", type=int, default=200,
+                        help='Maximum number of lanes of a quadtree area, unless it is at the maximum depth '
+                             '(default: 200)')
+    parser.add_argument("-convert_dump", "--convert_dump", type=str,
+                        help='Convert a JSON dump created by a former version into the binary dump format')
     
     parser.add_argument("-run", "--run", type=str,
                         help='Run a simulation process with the dump chosen')
@@ -211,14 +500,71 @@ def add_options(parser):
     parser.add_argument("-save", "--save", action="store_true",
                         help='Save the logs into the logs folder')
     parser.add_argument("-csv", "--csv", action="store_true",
-                        help="Export all data emissions into a CSV file")
+                        help="Export all data emissions while the simulation is running, into a CSV file "
+                             "or into the format chosen with -export_format")
+    parser.add_argument("-export_format", "--export_format", type=str, choices=list(EXPORTERS), default='csv',
+                        help='Format of the export : a CSV file of the total emissions of each area, '
+                             'or compressed NumPy chunks of the emissions of each pollutant (default: csv)')
+    parser.add_argument("-workers", "--workers", type=int, default=os.cpu_count(),
+                        help='Maximum number of simulations running at the same time (default: number of CPUs)')
+    parser.add_argument("-timeout", "--timeout", type=float,
+                        help='Maximum duration of a simulation in seconds, a simulation exceeding it is stopped')
+    parser.add_argument("-retries", "--retries", type=int, default=0,
+                        help='Number of times a failed or stopped simulation is started again (default: 0)')
+    parser.add_argument("-resume", "--resume", action="store_true",
+                        help='Continue the simulations from their last checkpoint, saved every '
+                             'checkpoint_interval steps of the configuration file')
+    parser.add_argument("-sweep", "--sweep", type=str,
+                        help='Tune the configuration chosen with -c by a sweep over the parameters values '
+                             'of the sweep file, pruning the worst configurations by successive halving')
+    parser.add_argument("-warmup", "--warmup", type=int,
+                        help='Simulate the first N steps without actions once, then start all the simulations '
+                             'from the state reached')
+    parser.add_argument("-profile", "--profile", action="store_true",
+                        help='Sample the stacks of the simulation loop and save them into the logs folder, '
+                             'with the durations of the phases of every step')
    
+def run_warmup(data, config_files, warmup_steps, scheduler, save_logs, dump_path=None):
+    """
+    Simulate the warm-up steps shared by all the configurations once, without actions,
+    and save the state reached as a snapshot from which the simulations start
+    :param data: The Data instance
+    :param config_files: The configuration files, the first one giving the SUMO options of the warm-up
+    :param warmup_steps: The number of warm-up steps
+    :param scheduler: The Scheduler instance running the warm-up
+    :param save_logs: If save_logs == True, it will save the logs into the logs directory
+    :param dump_path: The path to the binary dump of data, see RunProcess
+    :return: The snapshot directory, None if the warm-up failed
+    """
+    for config_file in config_files:
+        if Config(config_file, data).n_steps <= warmup_steps:
+            print(f'The number of steps of {config_file} must be greater than the {warmup_steps} warm-up steps')
+            return None
+    
+    snapshot_dir = os.path.join(data.dir, 'checkpoints', f'{data.dump_name}_warmup_{warmup_steps}')
+    
+    def create_warmup_process(conf, result_queue):
+        config = Config(conf, data)
+        config.n_steps = warmup_steps
+        config.without_actions_mode = True
+        config.checkpoint_interval = None
+        config.check_config()
+        return RunProcess(None if dump_path is not None else data, config, save_logs, False, result_queue,
+                          dump_path, snapshot_dir=snapshot_dir, save_snapshot=True)
+    
+    print(f'Warm-up of {warmup_steps} steps')
+    job, = scheduler.run(config_files[:1], create_warmup_process)
+    if job.status != 'done':
+        print('The warm-up simulation failed')
+        return None
+    return snapshot_dir
+    
 def check_user_entry(args):
     """
     Check the user entry consistency
     """
     if (args.new_dump is not None):
-        if(args.areas is None or args.simulation_dir is None):
+        if(args.simulation_dir is None or (args.areas is None and args.partition == 'grid')):
             print('The -new_dump argument requires the -areas and -simulation_dir options')
             return False
         
@@ -227,6 +573,16 @@ def check_user_entry(args):
             print('The -run argument requires the -c or -c_dir')
             return False
     
+    if (args.sweep is not None):
+        if(args.run is None or args.c is None):
+            print('The -sweep argument requires the -run and -c options')
+            return False
+        
+    if (args.warmup is not None):
+        if(args.run is None or args.sweep is not None or args.warmup <= 0):
+            print('The -warmup argument requires the -run option, a positive number of steps, and no sweep')
+            return False
+    
     return True 
     
 def main(args):
@@ -242,16 +598,19 @@ def main(args):
     if(check_user_entry(args)):
         
         if args.new_dump is not None:
-            if (args.simulation_dir is not None) and (args.areas is not None): 
-                create_dump(args.new_dump, args.simulation_dir, args.areas)
+            if args.simulation_dir is not None: 
+                create_dump(args.new_dump, args.simulation_dir, args.areas, args.offline, args.processes,
+                            args.partition, args.max_depth, args.max_lanes)
+        
+        if args.convert_dump is not None:
+            convert_dump(args.convert_dump)
         
         if args.run is not None:
             dump_path = f'{args.run}'
             if os.path.isfile(dump_path):
-                with open(dump_path, 'r') as f:
-                    data = jsonpickle.decode(f.read())
+                shared = dumpfile.is_dump_file(dump_path)
+                data = Data.load(dump_path, use_mmap=shared)
                 
-                process = []
                 files = [] 
                 
                 if args.c is not None: 
@@ -264,13 +623,32 @@ def main(args):
                     for config in bundle_files:
                         files.append(os.path.join(path, config))
 
-                for conf in files: # Initialize all process
-                    config = Config(conf,data)  
-                    p = RunProcess(data, config, args.save, args.csv)
-                    process.append(p)                    
-                    p.start()
-                        
-                for p in process : p.join() 
+                scheduler = Scheduler(args.workers, args.timeout, args.retries)
+                
+                snapshot_dir = None
+                if args.warmup is not None:
+                    snapshot_dir = run_warmup(data, files, args.warmup, scheduler,
+                                              args.save, dump_path if shared else None)
+                    if snapshot_dir is None:
+                        return
+                
+                reference_cache = reference.ReferenceCache(os.path.join(data.dir, 'references'))
+                
+                def create_process(conf, result_queue):
+                    config = Config(conf, data)
+                    # A process attached to the shared dump loads it itself, instead of receiving a copy
+                    return RunProcess(None if shared else data, config, args.save, args.csv, result_queue,
+                                      dump_path if shared else None, args.export_format, args.resume, snapshot_dir,
+                                      reference_cache=reference_cache, profile=args.profile)
+                
+                if args.sweep is not None:
+                    parameters_sweep = sweep.Sweep(data, files[0], args.sweep)
+                    sweep.print_ranking(parameters_sweep.run(scheduler, create_process))
+                    print(f'Sweep results saved into {parameters_sweep.dir}')
+                else:
+                    jobs = scheduler.run(files, create_process)
+                    reference.add_reductions(jobs, reference_cache)
+                    print_summary(jobs)
                 
 if __name__ == '__main__':
     main(sys.argv[1:])
@@ -0,0 +1,162 @@
+"""
+This module schedules the simulation processes of multiple configurations on a bounded pool of workers
+"""
+
+import collections
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+
+def _raise_system_exit(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def exit_on_terminate():
+    """
+    Make SIGTERM raise SystemExit into the current process, so that a process terminated by the scheduler
+    runs its cleanup (finally blocks) before exiting. Must be called from the main thread of the process.
+    """
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+
+
+class Job:
+    """
+    The Job class defines the run of a configuration file, which can be attempted several times
+    """
+
+    def __init__(self, index, config_file):
+        """
+        Job constructor
+        :param index: The index of the job in the queue
+        :param config_file: The path to the configuration file
+        """
+        self.index = index
+        self.config_file = config_file
+        self.attempts = 0
+        self.status = 'pending'
+        self.result = None
+        self.process = None
+        self.started = None
+
+    @property
+    def name(self):
+        """
+        :return: The unique name of the current attempt, given to its process
+        """
+        return f'{self.index}:{os.path.basename(self.config_file)}#{self.attempts}'
+
+
+class Scheduler:
+    """
+    The Scheduler class runs the jobs of a queue, with at most a given number of processes at the same time.
+    A job exceeding the timeout is terminated, then killed if it is still running after a grace period,
+    and a job which failed or timed out is retried.
+    Each process sends its results through a result queue.
+    """
+
+    def __init__(self, workers=None, timeout=None, retries=0, poll_interval=0.5, grace_period=10):
+        """
+        Scheduler constructor
+        :param workers: The maximum number of processes running at the same time (default: number of CPUs)
+        :param timeout: The maximum duration (in seconds) of a job attempt, None for no limit
+        :param retries: The number of times a failed job is started again
+        :param poll_interval: The interval (in seconds) between two checks of the running processes
+        :param grace_period: The time (in seconds) given to a terminated process to clean up before it is killed
+        """
+        self.workers = workers or os.cpu_count()
+        self.timeout = timeout
+        self.retries = retries
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+
+    def run(self, config_files, create_process):
+        """
+        Run a job for each configuration file
+        :param config_files: The list of configuration files
+        :param create_process: A function creating the process of a job
+        from a configuration file and the result queue, e.g. a RunProcess
+        :return: The list of jobs, in the order of the configuration files
+        """
+        jobs = [Job(index, config_file) for index, config_file in enumerate(config_files)]
+        pending = collections.deque(jobs)
+        running = []
+        results = multiprocessing.Queue()
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                job = pending.popleft()
+                job.attempts += 1
+                job.status = 'running'
+                job.result = None
+                job.process = create_process(job.config_file, results)
+                job.process.name = job.name
+                job.process.start()
+                job.started = time.perf_counter()
+                running.append(job)
+
+            self._collect(results, running, self.poll_interval)
+            for job in list(running):
+                timed_out = self.timeout is not None and time.perf_counter() - job.started > self.timeout
+                if job.process.is_alive() and not timed_out:
+                    continue
+
+                if timed_out and job.process.is_alive():
+                    job.process.terminate()
+                    job.process.join(self.grace_period)
+                    if job.process.is_alive():
+                        job.process.kill()
+                job.process.join()
+                self._collect(results, running, 0)
+                running.remove(job)
+
+                if job.result is not None and job.result['completed'] and job.process.exitcode == 0:
+                    job.status = 'done'
+                else:
+                    job.status = 'timeout' if timed_out else 'failed'
+                    if job.attempts <= self.retries:
+                        pending.append(job)
+                job.process = None
+        return jobs
+
+    @staticmethod
+    def _collect(results, running, timeout):
+        """
+        Receive the results sent by the processes and give them to their job
+        :param results: The result queue
+        :param running: The list of running jobs
+        :param timeout: The maximum time (in seconds) to wait for a first result
+        """
+        jobs = {job.name: job for job in running}
+        try:
+            result = results.get(timeout=timeout) if timeout else results.get_nowait()
+            while True:
+                if result['name'] in jobs:
+                    jobs[result['name']].result = result
+                result = results.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def print_summary(jobs):
+    """
+    Print the consolidated summary of the jobs : status, total emissions, reduction percentage against
+    the reference and real-time factor of each run
+    :param jobs: The list of jobs
+    """
+    width = max([len('Configuration')] + [len(os.path.basename(job.config_file)) for job in jobs])
+    print(f'{"Configuration":<{width}}  {"Status":<8}  {"Attempts":>8}  {"Total emissions (mg)":>22}  '
+          f'{"Reduction (%)":>13}  {"Real-time factor":>16}')
+    for job in jobs:
+        total = f'{job.result["total"]:.3f}' if job.result is not None else '-'
+        rtf = job.result['real_time_factor'] if job.result is not None else None
+        rtf = f'{rtf:.2f}' if rtf is not None else '-'
+        reduction = job.result.get('reduction') if job.result is not None else None
+        reduction = f'{reduction:.2f}' if reduction is not None else '-'
+        print(f'{os.path.basename(job.config_file):<{width}}  {job.status:<8}  {job.attempts:>8}  {total:>22}  '
+              f'{reduction:>13}  {rtf:>16}')
+
+    done = sum(job.status == 'done' for job in jobs)
+    print(f'{done}/{len(jobs)} simulations done')
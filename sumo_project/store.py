@@ -0,0 +1,72 @@
+"""
+This module defines how the emissions acquired during a simulation are stored
+"""
+
+import numpy as np
+
+from model import POLLUTANTS
+
+
+class EmissionStore:
+    """
+    The EmissionStore class keeps the emissions of all areas for every step of a simulation
+    into a preallocated (steps, areas, pollutants) array, optionally memory-mapped to a file
+    """
+
+    def __init__(self, n_steps: int, n_areas: int, filename: str = None):
+        """
+        EmissionStore constructor
+        :param n_steps: The number of steps of the simulation
+        :param n_areas: The number of areas in the grid
+        :param filename: If a filename is given, the array is memory-mapped to this .npy file,
+        otherwise it is kept in memory
+        """
+        shape = (n_steps, n_areas, len(POLLUTANTS))
+        self.filename = filename
+        if filename is None:
+            self.emissions = np.zeros(shape)
+        else:
+            self.emissions = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float64, shape=shape)
+
+    @property
+    def n_steps(self):
+        return self.emissions.shape[0]
+
+    @property
+    def n_areas(self):
+        return self.emissions.shape[1]
+
+    def add_step(self, step, areas_emissions):
+        """
+        Store the emissions of all areas for a step
+        :param step: The simulation step
+        :param areas_emissions: The array of emissions with shape (areas, pollutants)
+        """
+        self.emissions[step] = areas_emissions
+
+    def area_emissions(self, index):
+        """
+        :param index: The index of the area in the grid
+        :return: A (steps, pollutants) view on the emissions of the area
+        """
+        return self.emissions[:, index, :]
+
+    def values(self, step):
+        """
+        :param step: The simulation step
+        :return: The sum of all pollutant emissions (in mg) of each area for this step
+        """
+        return self.emissions[step].sum(axis=1)
+
+    def total(self):
+        """
+        :return: The sum of each pollutant emissions (in mg) over all areas and steps
+        """
+        return self.emissions.sum(axis=(0, 1))
+
+    def flush(self):
+        """
+        Write the memory-mapped array to disk
+        """
+        if self.filename is not None:
+            self.emissions.flush()
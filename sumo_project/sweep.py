@@ -0,0 +1,136 @@
+"""
+This module tunes the configuration parameters with a sweep over their values,
+the worst configurations being pruned by successive halving
+"""
+
+import datetime
+import itertools
+import json
+import math
+import os
+
+import emissions
+from scheduler import print_summary
+
+
+class Sweep:
+    """
+    The Sweep class generates a configuration file for each combination of the parameters values
+    and runs them in rungs of increasing duration. At the end of each rung, configurations are ranked
+    by reduction percentage of total emissions against a reference simulation without actions,
+    and only the best 1/reduction_factor of them are run again for a longer duration.
+    """
+
+    def __init__(self, data, base_config_file, sweep_file):
+        """
+        Sweep constructor
+        :param data: The Data instance
+        :param base_config_file: The configuration file giving the values of the options not swept
+        and the final number of steps
+        :param sweep_file: The sweep file in JSON format, with the values of each parameter ("parameters"),
+        the number of steps of the first rung ("min_steps") and the pruning factor ("reduction_factor")
+        """
+        with open(base_config_file, 'r') as f:
+            self.base = json.load(f)
+        with open(sweep_file, 'r') as f:
+            sweep = json.load(f)
+
+        self.parameters = sweep['parameters']
+        self.min_steps = sweep.get('min_steps', 100)
+        self.reduction_factor = sweep.get('reduction_factor', 2)
+        if self.reduction_factor < 2:
+            raise ValueError('The reduction factor of a sweep must be at least 2')
+
+        now = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+        base_name = os.path.basename(base_config_file).replace('.json', '')
+        self.dir = os.path.join(data.dir, 'sweep', f'{base_name}_{now}')
+
+        names = list(self.parameters)
+        self.candidates = [{'name': f'candidate_{index}', 'parameters': dict(zip(names, values)), 'reductions': {}}
+                           for index, values in enumerate(itertools.product(*self.parameters.values()))]
+
+    def rungs(self):
+        """
+        :return: The number of steps of each rung, the last one being the number of steps of the base configuration
+        """
+        n_steps = self.base['n_steps']
+        rungs = []
+        steps = self.min_steps
+        while steps < n_steps:
+            rungs.append(steps)
+            steps *= self.reduction_factor
+        rungs.append(n_steps)
+        return rungs
+
+    def write_config(self, rung_dir, name, options):
+        """
+        Write the configuration file of a simulation
+        :param rung_dir: The directory of the rung
+        :param name: The name of the configuration file
+        :param options: The options overriding the base configuration
+        :return: The path to the configuration file
+        """
+        path = os.path.join(rung_dir, f'{name}.json')
+        with open(path, 'w') as f:
+            json.dump({**self.base, **options}, f, indent=4)
+        return path
+
+    def run(self, scheduler, create_process):
+        """
+        Run the sweep
+        :param scheduler: The Scheduler instance running the simulations
+        :param create_process: A function creating the process of a simulation, see Scheduler.run
+        :return: The list of candidates of the last rung, from the best to the worst
+        """
+        survivors = self.candidates
+        for rung, n_steps in enumerate(self.rungs()):
+            rung_dir = os.path.join(self.dir, f'rung_{rung}')
+            os.makedirs(rung_dir)
+
+            print(f'Sweep rung {rung} : {len(survivors)} configurations, {n_steps} steps')
+            files = [self.write_config(rung_dir, 'reference', {'n_steps': n_steps, 'without_actions_mode': True})]
+            files += [self.write_config(rung_dir, candidate['name'], {**candidate['parameters'], 'n_steps': n_steps})
+                      for candidate in survivors]
+            jobs = scheduler.run(files, create_process)
+            print_summary(jobs)
+
+            reference = jobs[0]
+            if reference.status != 'done':
+                raise RuntimeError(f'The reference simulation of the rung {rung} failed')
+
+            for candidate, job in zip(survivors, jobs[1:]):
+                reduction = -math.inf
+                if job.status == 'done':
+                    reduction = emissions.get_reduction_percentage(reference.result['total'], job.result['total'])
+                candidate['reductions'][n_steps] = reduction
+
+            survivors = sorted(survivors, key=lambda candidate: candidate['reductions'][n_steps], reverse=True)
+            if n_steps < self.base['n_steps']:
+                survivors = survivors[:math.ceil(len(survivors) / self.reduction_factor)]
+
+        self.save()
+        return survivors
+
+    def save(self):
+        """
+        Save the parameters and reductions of all candidates into the sweep directory
+        :return: The path to the results file
+        """
+        path = os.path.join(self.dir, 'results.json')
+        results = [{**candidate, 'reductions': {str(n_steps): reduction if math.isfinite(reduction) else None
+                                                 for n_steps, reduction in candidate['reductions'].items()}}
+                   for candidate in self.candidates]
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=4)
+        return path
+
+
+def print_ranking(candidates):
+    """
+    Print the parameters and reduction percentage of the candidates of the last rung
+    :param candidates: The ranked list of candidates
+    """
+    for rank, candidate in enumerate(candidates, 1):
+        n_steps, reduction = list(candidate['reductions'].items())[-1]
+        parameters = ', '.join(f'{name} = {value}' for name, value in candidate['parameters'].items())
+        print(f'{rank}. {candidate["name"]} : {reduction:.2f}% of reduction in {n_steps} steps ({parameters})')
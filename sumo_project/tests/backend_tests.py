@@ -0,0 +1,78 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import backend
+from config import Config
+from data import Data
+from netfile import NetFile
+from runner import RunProcess
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'files', 'simulations', 'mulhouse_simulation')
+SIMULATION_FILES = ['osm.sumocfg', 'osm.net.xml', 'osm.passenger.trips.xml', 'osm.poly.xml', 'osm.view.xml']
+
+
+class BackendTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name in SIMULATION_FILES:
+            shutil.copy(os.path.join(SIMULATION_DIR, name), self.dir.name)
+
+        network = NetFile(os.path.join(self.dir.name, 'osm.net.xml')).read()
+        self.data = Data('parity', network.map_bounds, 2, self.dir.name)
+        self.data.init_grid()
+        self.data.add_net_data_to_areas(network)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_config(self, name, **options):
+        config = {'_SUMOCMD': 'sumo', 'n_steps': 150, 'window_size': 20, 'without_actions_mode': False,
+                  'limit_speed_mode': True, 'speed_rf': 0.1, 'adjust_traffic_light_mode': True,
+                  'trafficLights_duration_rf': 0.2, 'weight_routing_mode': False, 'lock_area_mode': False,
+                  'emissions_threshold': 20000, **options}
+        path = os.path.join(self.dir.name, f'{name}.json')
+        with open(path, 'w') as f:
+            json.dump(config, f)
+        return path
+
+    def run_simulation(self, config_file):
+        result_queue = multiprocessing.Queue()
+        process = RunProcess(self.data, Config(config_file, self.data), False, False, result_queue)
+        process.start()
+        process.join(timeout=300)
+        self.assertEqual(process.exitcode, 0)
+        return result_queue.get(timeout=10)
+
+    def test_failed_start_reports(self):
+        config = Config(self.write_config('missing', _SUMOCMD='missing-sumo'), self.data)
+        result_queue = multiprocessing.Queue()
+        process = RunProcess(self.data, config, False, False, result_queue)
+        process.start()
+        process.join(timeout=60)
+        self.assertNotEqual(process.exitcode, 0)
+
+        result = result_queue.get(timeout=10)
+        self.assertFalse(result['completed'])
+        self.assertEqual(result['steps'], 0)
+
+    def test_gui_falls_back_to_traci(self):
+        config = Config(self.write_config('gui', _SUMOCMD='sumo-gui', backend='libsumo'), self.data)
+        self.assertEqual(config.backend, 'traci')
+
+    @unittest.skipUnless(backend.is_available('libsumo'), 'libsumo is not installed')
+    def test_libsumo_parity(self):
+        traci_result = self.run_simulation(self.write_config('traci', backend='traci'))
+        libsumo_result = self.run_simulation(self.write_config('libsumo', backend='libsumo'))
+
+        self.assertTrue(traci_result['completed'] and libsumo_result['completed'])
+        self.assertGreater(traci_result['total'], 0)
+        self.assertEqual(libsumo_result['pollutants'], traci_result['pollutants'])
+
+
+if __name__ == '__main__':
+    unittest.main()
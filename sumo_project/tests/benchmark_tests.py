@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import emissions
+import actions
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from benchmarks.run_benchmarks import check_regressions, create_data, create_traci_data, result_key
+from registry import VehicleRegistry
+
+
+class FakeTraciTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.network = synthetic_network(200, 10, ((0, 0), (1000, 1000)))
+        self.data = create_data(self.network, 4, self.dir.name)
+        self.fake = FakeTraci(self.network, 50)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_registry_follows_vehicles(self):
+        with plug(self.fake):
+            registry = VehicleRegistry()
+            for _ in range(5):
+                self.fake.simulationStep()
+                registry.update()
+                areas_emissions = registry.sum_by_area(self.data)
+
+            self.assertEqual(len(registry.slots), 50)
+            self.assertEqual(set(registry.slots), set(self.fake.ids))
+            np.testing.assert_allclose(areas_emissions.sum(axis=0), self.fake.emissions.sum(axis=0))
+
+            vehicles = emissions.get_all_vehicles()
+            self.assertEqual(len(vehicles), 50)
+
+    def test_actions_are_recorded(self):
+        area = max(self.data.grid, key=lambda area: len(area._lanes))
+        with plug(self.fake):
+            actions.limit_speed_into_area(area, 0.1)
+            actions.reverse_actions(area)
+        self.assertEqual(self.fake.calls['lane.setMaxSpeed'], 2 * len(area._lanes))
+        self.assertIsNot(actions.traci, self.fake)
+
+    def test_data_recovered_with_traci(self):
+        with plug(self.fake):
+            data = create_traci_data(self.network.map_bounds, 4, self.dir.name)
+        for area, expected in zip(data.grid, self.data.grid):
+            self.assertEqual(sorted(lane.lane_id for lane in area._lanes),
+                             sorted(lane.lane_id for lane in expected._lanes))
+            self.assertEqual(sorted(tl.tl_id for tl in area._tls), sorted(tl.tl_id for tl in expected._tls))
+        self.assertGreater(sum(len(area._tls) for area in data.grid), 0)
+
+
+class RegressionTests(unittest.TestCase):
+    def test_check_regressions(self):
+        results = [{'name': 'get_emissions', 'params': {'vehicles': 100, 'grid': 4}, 'time': 0.003},
+                   {'name': 'data_save', 'params': {'lanes': 1000}, 'time': 0.010}]
+        baseline = {'get_emissions[vehicles=100,grid=4]': 0.001, 'data_save[lanes=1000]': 0.009}
+        self.assertEqual(result_key(results[0]), 'get_emissions[vehicles=100,grid=4]')
+        self.assertEqual(check_regressions(results, baseline, 1.0),
+                         [('get_emissions[vehicles=100,grid=4]', 0.003, 0.001)])
+
+
+if __name__ == '__main__':
+    unittest.main()
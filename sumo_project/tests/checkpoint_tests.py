@@ -0,0 +1,140 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import actions
+import checkpoint
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from benchmarks.run_benchmarks import create_data, create_process
+from config import Config
+from data import Data
+from netfile import NetFile
+from registry import VehicleRegistry
+from runner import RunProcess
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'files', 'simulations', 'mulhouse_simulation')
+SIMULATION_FILES = ['osm.sumocfg', 'osm.net.xml', 'osm.passenger.trips.xml', 'osm.poly.xml', 'osm.view.xml']
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.network = synthetic_network(200, 10, ((0, 0), (1000, 1000)))
+        self.checkpoint_dir = os.path.join(self.dir.name, 'checkpoints')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def create_process(self):
+        p = create_process(create_data(self.network, 4, self.dir.name), n_steps=20, window_size=5)
+        p.config.config_filename = 'test.json'
+        p.registry = VehicleRegistry()
+        p.exporter = None
+        return p
+
+    def run_steps(self, p, fake, steps):
+        for step in steps:
+            fake.simulationStep()
+            p.registry.update()
+            p.store.add_step(step, p.registry.sum_by_area(p.data))
+
+    def test_round_trip(self):
+        p = self.create_process()
+        with plug(FakeTraci(self.network, 50)) as fake:
+            self.run_steps(p, fake, range(6))
+            checkpoint.save_checkpoint(p, 6, self.checkpoint_dir)
+            actions.limit_speed_into_area(p.data.grid[1], 0.1)
+            actions.lock_area(p.data.grid[2])
+            self.run_steps(p, fake, range(6, 10))
+            path = checkpoint.save_checkpoint(p, 10, self.checkpoint_dir)
+
+            self.assertEqual(path, os.path.join(self.checkpoint_dir, 'checkpoint.npz'))
+            # Each checkpoint only writes the steps since the previous one
+            self.assertEqual(sorted(f for f in os.listdir(self.checkpoint_dir) if f.startswith('emissions_')),
+                             ['emissions_0_6.npy', 'emissions_6_10.npy'])
+            self.assertEqual(len(np.load(os.path.join(self.checkpoint_dir, 'emissions_6_10.npy'))), 4)
+
+            restored = self.create_process()
+            self.assertEqual(checkpoint.restore_checkpoint(restored, self.checkpoint_dir), 10)
+
+        np.testing.assert_array_equal(restored.store.emissions[:10], p.store.emissions[:10])
+        self.assertEqual(restored.store.emissions[10:].sum(), 0)
+        for area, restored_area in zip(p.data.grid, restored.data.grid):
+            for flag in checkpoint.AREA_FLAGS:
+                self.assertEqual(getattr(restored_area, flag), getattr(area, flag))
+        self.assertEqual(set(restored.registry.slots), set(p.registry.slots))
+        self.assertEqual(restored.registry.class_names, p.registry.class_names)
+        np.testing.assert_array_equal(restored.registry.class_emissions, p.registry.class_emissions)
+
+    def test_resumed_checkpoints_continue_segments(self):
+        p = self.create_process()
+        with plug(FakeTraci(self.network, 50)) as fake:
+            self.run_steps(p, fake, range(6))
+            checkpoint.save_checkpoint(p, 6, self.checkpoint_dir)
+
+            resumed = self.create_process()
+            checkpoint.restore_checkpoint(resumed, self.checkpoint_dir)
+            self.run_steps(resumed, fake, range(6, 8))
+            checkpoint.save_checkpoint(resumed, 8, self.checkpoint_dir)
+
+            restored = self.create_process()
+            self.assertEqual(checkpoint.restore_checkpoint(restored, self.checkpoint_dir), 8)
+        np.testing.assert_array_equal(restored.store.emissions[:8], resumed.store.emissions[:8])
+
+    def test_no_checkpoint(self):
+        self.assertEqual(checkpoint.restore_checkpoint(self.create_process(), self.checkpoint_dir), 0)
+
+
+class ResumeTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name in SIMULATION_FILES:
+            shutil.copy(os.path.join(SIMULATION_DIR, name), self.dir.name)
+
+        network = NetFile(os.path.join(self.dir.name, 'osm.net.xml')).read()
+        self.data = Data('resume', network.map_bounds, 2, self.dir.name)
+        self.data.init_grid()
+        self.data.add_net_data_to_areas(network)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_config(self, name, **options):
+        config = {'_SUMOCMD': 'sumo', 'n_steps': 120, 'window_size': 20, 'without_actions_mode': False,
+                  'limit_speed_mode': False, 'speed_rf': 0.1, 'adjust_traffic_light_mode': False,
+                  'trafficLights_duration_rf': 0.2, 'weight_routing_mode': False, 'lock_area_mode': False,
+                  'emissions_threshold': 1e12, 'checkpoint_interval': 60, **options}
+        path = os.path.join(self.dir.name, f'{name}.json')
+        with open(path, 'w') as f:
+            json.dump(config, f)
+        return path
+
+    def run_simulation(self, config_file, resume):
+        result_queue = multiprocessing.Queue()
+        process = RunProcess(self.data, Config(config_file, self.data), False, False, result_queue, resume=resume)
+        process.start()
+        process.join(timeout=300)
+        self.assertEqual(process.exitcode, 0)
+        return result_queue.get(timeout=10)
+
+    def test_traffic_lights_programs_restored(self):
+        results = {}
+        for name, adjust_traffic_light_mode in (('tls', True), ('no_tls', False)):
+            config_file = self.write_config(name, adjust_traffic_light_mode=adjust_traffic_light_mode)
+            self.run_simulation(config_file, resume=False)
+            results[name] = self.run_simulation(config_file, resume=True)
+
+        # No area is adjusted, the traffic lights must continue their initial programs after the restore
+        self.assertEqual(results['tls']['simulated_steps'], 60)
+        self.assertGreater(results['tls']['total'], 0)
+        self.assertEqual(results['tls']['pollutants'], results['no_tls']['pollutants'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from control import ControlLag
+
+
+class ControlLagTests(unittest.TestCase):
+    def test_every_step(self):
+        control_lag = ControlLag(2)
+        for step, over in enumerate([(True, False), (False, False), (True, True)]):
+            control_lag.update(step, np.array(over), tick=True)
+        self.assertEqual(control_lag.mismatch_percentage(), 0)
+        self.assertEqual(control_lag.mean_latency(), 0)
+
+    def test_control_period(self):
+        control_lag = ControlLag(2)
+        # The first area goes over the threshold at step 1, the second one at step 2 and below again at step 3
+        states = [(False, False), (True, False), (True, True), (True, False), (True, False)]
+        for step, over in enumerate(states):
+            control_lag.update(step, np.array(over), tick=(step + 1) % 5 == 0)
+
+        # The first area waits from the step 1 to the tick of the step 4
+        self.assertEqual(control_lag.latencies, [3])
+        self.assertEqual(control_lag.mismatches, 4)
+        self.assertAlmostEqual(control_lag.mismatch_percentage(), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
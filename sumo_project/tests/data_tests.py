@@ -0,0 +1,306 @@
+import contextlib
+import io
+import json
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import jsonpickle
+import numpy as np
+from shapely.geometry import LineString, Point
+
+import dumpfile
+from data import Data
+from model import Lane, Logic, Phase, TrafficLight, create_sumo_logic
+from benchmarks.fake_traci import synthetic_network
+from netfile import CACHE_VERSION, NetFile, Network, NetworkCache, network_key
+from runner import convert_dump
+
+LEGACY_DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'legacy_dump.json')
+
+
+class GridTests(unittest.TestCase):
+    def setUp(self):
+        self.data = Data('test_dump', ((0, 0), (1000, 600)), 4, '/test_simulation')
+        self.data.init_grid()
+
+    def test_locate_matches_areas(self):
+        rng = np.random.default_rng(42)
+        positions = rng.uniform((0, 0), (1000, 600), size=(200, 2))
+        indexes = self.data.locate(positions[:, 0], positions[:, 1])
+        for (x, y), index in zip(positions, indexes):
+            self.assertIn(Point(x, y), self.data.grid[index])
+
+    def test_locate_outside_grid(self):
+        indexes = self.data.locate(np.array([-1, 500, 1001]), np.array([300, 601, 300]))
+        self.assertEqual(indexes.tolist(), [-1, -1, -1])
+
+    def test_sum_by_area(self):
+        positions = np.array([(10, 10), (20, 20), (990, 590), (-5, 10)])
+        values = np.array([(1, 2), (3, 4), (5, 6), (7, 8)])
+        sums = self.data.sum_by_area(positions, values)
+        self.assertEqual(sums.shape, (16, 2))
+        self.assertEqual(sums[0].tolist(), [4, 6])
+        self.assertEqual(sums[15].tolist(), [5, 6])
+        self.assertEqual(sums.sum(), 21)
+
+    def test_sum_by_area_without_values(self):
+        sums = self.data.sum_by_area(np.empty((0, 2)), np.empty((0, 5)))
+        self.assertEqual(sums.shape, (16, 5))
+        self.assertEqual(sums.sum(), 0)
+
+    def test_lanes_to_areas(self):
+        inner_lane = Lane('inner', LineString([(10, 10), (100, 10)]), 13.9)
+        crossing_lane = Lane('crossing', LineString([(200, 10), (300, 10)]), 13.9)
+        for area in self.data.grid:
+            for lane in (inner_lane, crossing_lane):
+                if area.intersects(lane.polygon):
+                    area.add_lane(lane)
+
+        lane_ids, (lane_indexes, area_indexes, weights) = self.data.lanes_to_areas()
+        self.assertEqual(lane_ids, ['crossing', 'inner'])
+        matrix = {(lane_ids[l], a): w for l, a, w in zip(lane_indexes, area_indexes, weights)}
+        self.assertEqual(matrix, {('inner', 0): 1.0, ('crossing', 0): 0.5, ('crossing', 4): 0.5})
+
+
+class QuadtreeTests(unittest.TestCase):
+    def setUp(self):
+        self.data = Data('test_dump', ((0, 0), (1000, 600)), None, '/test_simulation')
+        # Dense lanes in the bottom left corner, one lane in the top right corner
+        lanes = [Lane(f'dense_{k}', LineString([(10 + k, 10), (10 + k, 100)]), 13.9) for k in range(10)]
+        lanes.append(Lane('sparse', LineString([(800, 500), (900, 500)]), 13.9))
+        self.data.init_quadtree(lanes, max_depth=3, max_lanes=2)
+
+    def test_empty_areas_dropped(self):
+        self.assertEqual([area.name for area in self.data.grid],
+                         ['Area (3,0,0)', 'Area (3,0,1)', 'Area (1,1,1)'])
+        self.assertEqual(self.data.cells.shape, (8, 8))
+
+    def test_locate_matches_areas(self):
+        rng = np.random.default_rng(42)
+        positions = rng.uniform((0, 0), (1000, 600), size=(500, 2))
+        indexes = self.data.locate(positions[:, 0], positions[:, 1])
+        for (x, y), index in zip(positions, indexes):
+            containing = [i for i, area in enumerate(self.data.grid) if Point(x, y) in area]
+            self.assertEqual(containing, [index] if index >= 0 else [])
+
+    def test_save_cells(self):
+        with tempfile.TemporaryDirectory() as simulation_dir:
+            self.data.dir = simulation_dir
+            self.data.intern_topology()
+            loaded = Data.load(self.data.save())
+        self.assertEqual(loaded.partition, 'quadtree')
+        self.assertEqual(loaded.cells.tolist(), self.data.cells.tolist())
+
+
+class TopologyTests(unittest.TestCase):
+    def setUp(self):
+        self.data = Data('test_dump', ((0, 0), (1000, 600)), 2, '/test_simulation')
+        self.data.init_grid()
+        # Duplicated lane objects, as in dumps created before the lanes table
+        for area in self.data.grid[:2]:
+            area.add_lane(Lane('crossing', LineString([(10, 10), (10, 590)]), 13.9))
+        self.data.grid[3].add_lane(Lane('inner', LineString([(600, 400), (900, 400)]), 8.3))
+
+    def test_intern_topology(self):
+        self.data.intern_topology()
+        self.assertEqual([lane.lane_id for lane in self.data.lanes], ['crossing', 'inner'])
+        self.assertIs(next(iter(self.data.grid[0]._lanes)), next(iter(self.data.grid[1]._lanes)))
+        self.assertEqual([area.lane_indexes for area in self.data.grid], [[0], [0], [], [1]])
+
+    def test_save_areas_by_index(self):
+        self.data.intern_topology()
+        loaded = jsonpickle.decode(jsonpickle.encode(self.data))
+        self.assertEqual(len(loaded.lanes), 2)
+        self.assertIs(next(iter(loaded.grid[0]._lanes)), loaded.lanes[0])
+        self.assertIs(next(iter(loaded.grid[3]._lanes)), loaded.lanes[1])
+
+
+class DumpFileTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.data = Data('test_dump', ((0, 0), (1000, 600)), 2, self.dir.name)
+        self.data.init_grid()
+        phases = [Phase(30, 10, 40, 'GGrr'), Phase(3, 3, 3, 'yyrr')]
+        logic = Logic(create_sumo_logic('0', 0, [phase.to_sumo() for phase in phases]), phases)
+        tl = TrafficLight('tl', [logic])
+        self.data.grid[0].add_lane(Lane('crossing', LineString([(10, 10), (10, 590)]), 13.9))
+        self.data.grid[1].add_lane(Lane('crossing', LineString([(10, 10), (10, 590)]), 13.9))
+        self.data.grid[1].add_tl(tl)
+        self.data.grid[3].add_lane(Lane('inner', LineString([(600, 400), (750, 450), (900, 400)]), 8.3))
+        self.data.intern_topology()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load(self):
+        loaded = Data.load(self.data.save())
+        self.assertEqual(loaded.map_bounds, ((0, 0), (1000, 600)))
+        self.assertEqual([lane.lane_id for lane in loaded.lanes], ['crossing', 'inner'])
+        self.assertEqual(list(loaded.lanes[1].polygon.coords), [(600, 400), (750, 450), (900, 400)])
+        self.assertEqual(loaded.lanes[1].initial_max_speed, 8.3)
+        self.assertEqual([area.bounds for area in loaded.grid], [area.bounds for area in self.data.grid])
+        self.assertEqual([area.name for area in loaded.grid], [area.name for area in self.data.grid])
+        self.assertIs(next(iter(loaded.grid[0]._lanes)), next(iter(loaded.grid[1]._lanes)))
+
+        tl = next(iter(loaded.grid[1]._tls))
+        self.assertEqual(tl.tl_id, 'tl')
+        self.assertEqual([(p.duration, p.minDuration, p.maxDuration, p.phaseDef) for p in tl._logics[0]._phases],
+                         [(30, 10, 40, 'GGrr'), (3, 3, 3, 'yyrr')])
+
+    def test_load_shared(self):
+        loaded = Data.load(self.data.save(), use_mmap=True)
+        lane = loaded.lanes[1]
+        self.assertFalse(lane.coords.flags.writeable)
+        self.assertEqual(list(lane.polygon.coords), [(600, 400), (750, 450), (900, 400)])
+        self.assertIs(next(iter(loaded.grid[3]._lanes)), lane)
+        self.assertEqual(loaded.locate(np.array([700]), np.array([400])).tolist(), [3])
+
+    def test_load_json_dump(self):
+        path = os.path.join(self.dir.name, 'test_dump.json')
+        with open(path, 'w') as f:
+            f.write(jsonpickle.encode(self.data))
+        loaded = Data.load(path)
+        self.assertEqual([lane.lane_id for lane in loaded.lanes], ['crossing', 'inner'])
+        self.assertIs(next(iter(loaded.grid[3]._lanes)), loaded.lanes[1])
+
+    def test_convert_legacy_json_dump(self):
+        # JSON dump saved by the first version, without saved state nor lanes, traffic lights and cells tables
+        with open(LEGACY_DUMP, 'r') as f:
+            legacy = json.load(f)
+        legacy['dir'] = self.dir.name
+        json_path = os.path.join(self.dir.name, 'legacy_dump.json')
+        with open(json_path, 'w') as f:
+            json.dump(legacy, f)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_dump(json_path)
+        loaded = Data.load(os.path.join(self.dir.name, 'dump', 'legacy_dump.dump'))
+
+        self.assertEqual((loaded.partition, loaded.cells.tolist()), ('grid', [[0, 1], [2, 3]]))
+        self.assertEqual(sorted(lane.lane_id for lane in loaded.lanes), ['crossing', 'inner'])
+        self.assertEqual([sorted(lane.lane_id for lane in area._lanes) for area in loaded.grid],
+                         [['crossing'], [], ['crossing'], ['inner']])
+        self.assertEqual([sorted(tl.tl_id for tl in area._tls) for area in loaded.grid], [['tl'], [], ['tl'], []])
+        tl, = loaded.tls
+        self.assertEqual([(p.duration, p.minDuration, p.maxDuration, p.phaseDef) for p in tl._logics[0]._phases],
+                         [(30, 10, 40, 'GGrr'), (3, 3, 3, 'yyrr')])
+        self.assertEqual(loaded.locate(np.array([700]), np.array([400])).tolist(), [3])
+
+    def test_unsupported_version(self):
+        path = self.data.save()
+        with open(path, 'r+b') as f:
+            f.seek(len(dumpfile.MAGIC))
+            f.write(struct.pack('<I', dumpfile.VERSION + 1))
+        with self.assertRaises(ValueError):
+            Data.load(path)
+
+
+class NetworkCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = NetworkCache(os.path.join(self.dir.name, 'cache'))
+        phases = [Phase(30, 10, 40, 'GGrr')]
+        tl = TrafficLight('tl', [Logic(create_sumo_logic('0', 0, [phase.to_sumo() for phase in phases]), phases)])
+        lanes = [Lane('crossing', LineString([(10, 10), (10, 590)]), 13.9),
+                 Lane('inner', LineString([(600, 400), (900, 400)]), 8.3)]
+        self.network = Network(((0, 0), (1000, 600)), lanes, {'tl': tl}, {'inner': ['tl']})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_network(self):
+        self.assertIsNone(self.cache.load('unknown'))
+
+    def test_key_depends_on_mode_and_version(self):
+        net_file = os.path.join(self.dir.name, 'test.net.xml')
+        with open(net_file, 'w') as f:
+            f.write('<net/>')
+        offline_key = network_key(net_file, 'offline')
+        self.assertEqual(network_key(net_file, 'offline'), offline_key)
+        self.assertNotEqual(network_key(net_file, 'traci'), offline_key)
+        with mock.patch('netfile.CACHE_VERSION', CACHE_VERSION + 1):
+            self.assertNotEqual(network_key(net_file, 'offline'), offline_key)
+        with self.assertRaises(ValueError):
+            network_key(net_file, 'unknown')
+
+    def test_regrid_from_cache(self):
+        self.cache.save('key', self.network)
+        network = self.cache.load('key')
+        self.assertEqual(network.map_bounds, ((0, 0), (1000, 600)))
+        self.assertEqual(network.lanes_tls, {'inner': ['tl']})
+
+        for areas_number in (2, 4):
+            data = Data('test_dump', network.map_bounds, areas_number, self.dir.name)
+            data.init_grid()
+            data.add_net_data_to_areas(network)
+            self.assertEqual([lane.lane_id for lane in data.lanes], ['crossing', 'inner'])
+            self.assertEqual([tl.tl_id for tl in data.tls], ['tl'])
+
+
+NET_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<net version="1.9">
+    <location netOffset="0.00,0.00" convBoundary="0.00,0.00,1000.00,600.00" origBoundary="0,0,1,1" projParameter="!"/>
+    <edge id="a" from="j0" to="j1" priority="1">
+        <lane id="a_0" index="0" speed="13.89" length="100.00" shape="10.00,10.00 110.00,10.00"/>
+        <lane id="a_1" index="1" speed="8.33" length="100.00" shape="10.00,13.20 60.00,13.20 110.00,13.20"/>
+    </edge>
+    <edge id="b" from="j1" to="j2" priority="1">
+        <lane id="b_0" index="0" speed="27.78" length="200.00" shape="110.00,10.00 310.00,10.00"/>
+    </edge>
+    <tlLogic id="j1" type="static" programID="0" offset="0">
+        <phase duration="31" state="Gr"/>
+        <phase duration="4" minDur="2" maxDur="6" state="yr"/>
+    </tlLogic>
+    <junction id="j1" type="traffic_light" x="110.00" y="10.00" incLanes="a_0 a_1" intLanes="" shape=""/>
+    <connection from="a" to="b" fromLane="0" toLane="0" tl="j1" linkIndex="0" dir="s" state="O"/>
+    <connection from="a" to="b" fromLane="1" toLane="0" tl="j1" linkIndex="1" dir="s" state="O"/>
+    <connection from="b" to="a" fromLane="0" toLane="0" tl="rail_crossing" linkIndex="0" dir="t" state="O"/>
+</net>
+"""
+
+
+class NetFileTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.net.xml')
+        with open(self.path, 'w') as f:
+            f.write(NET_XML)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_read(self):
+        network = NetFile(self.path).read()
+        self.assertEqual(network.map_bounds, ((0, 0), (1000, 600)))
+        self.assertEqual([(lane.lane_id, lane.initial_max_speed) for lane in network.lanes],
+                         [('a_0', 13.89), ('a_1', 8.33), ('b_0', 27.78)])
+        self.assertEqual(list(network.lanes[1].polygon.coords), [(10, 13.2), (60, 13.2), (110, 13.2)])
+
+        logic, = network.tls['j1']._logics
+        self.assertEqual([(phase.duration, phase.minDuration, phase.maxDuration, phase.phaseDef)
+                          for phase in logic._phases], [(31, 31, 31, 'Gr'), (4, 2, 6, 'yr')])
+        self.assertEqual(logic._logic.programID, '0')
+
+    def test_traffic_lights_without_program_skipped(self):
+        network = NetFile(self.path).read()
+        self.assertEqual(list(network.tls), ['j1'])
+        self.assertEqual(network.lanes_tls, {'a_0': ['j1'], 'a_1': ['j1'], 'b_0': []})
+
+
+class IntersectingLanesTests(unittest.TestCase):
+    def test_pool_matches_single_process(self):
+        network = synthetic_network(500, 0, ((0, 0), (1000, 600)))
+        data = Data('test_dump', network.map_bounds, 4, '/test_simulation')
+        data.init_grid()
+
+        pairs = data.intersecting_lanes(network.lanes)
+        self.assertGreater(len(pairs), 500)
+        self.assertEqual(sorted(map(tuple, data.intersecting_lanes(network.lanes, processes=3))),
+                         sorted(map(tuple, pairs)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+from shapely.geometry import LineString
+
+import emissions
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from data import Data
+from model import Lane
+
+
+class LaneEmissionsTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.data = Data('lanes', ((0, 0), (1000, 1000)), 2, self.dir.name)
+        self.data.init_grid()
+        lanes = [Lane('inner', LineString([(100, 100), (200, 100)]), 13.9),
+                 # 100 m into the area 0 and 200 m into the area 2
+                 Lane('shared', LineString([(400, 100), (700, 100)]), 13.9)]
+        for area in self.data.grid:
+            for lane in lanes:
+                if area.intersects(lane.polygon):
+                    area.add_lane(lane)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_length_weighted_sums(self):
+        p = SimpleNamespace(data=self.data)
+        fake = FakeTraci(synthetic_network(1, 0), 0)
+        with plug(fake):
+            emissions.subscribe_lanes(p)
+        self.assertEqual(fake.calls['lane.subscribe'], 2)
+
+        results = {'inner': dict(zip(emissions.LANE_VARIABLES, (10.0, 20.0, 30.0, 40.0, 50.0))),
+                   'shared': dict(zip(emissions.LANE_VARIABLES, (300.0, 600.0, 900.0, 1200.0, 1500.0)))}
+        areas_emissions = emissions.sum_lanes_emissions(p, results)
+
+        expected = np.zeros((4, 5))
+        expected[0] = [10 + 100, 20 + 200, 30 + 300, 40 + 400, 50 + 500]
+        expected[2] = [200, 400, 600, 800, 1000]
+        np.testing.assert_allclose(areas_emissions, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from export import CsvExporter, Exporter, NpzExporter, read_npz_export
+
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.names = ['Area (0,0)', 'Area (0,1)']
+        rng = np.random.default_rng(42)
+        self.emissions = rng.uniform(0, 1000, size=(25, 2, 5))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_csv_batches(self):
+        path = os.path.join(self.dir.name, 'export.csv')
+        exporter = CsvExporter(path, self.names, batch_size=10)
+        for step in range(15):
+            exporter.add_step(step, self.emissions[step])
+
+        # The first batch can be read while the simulation is running
+        with open(path, 'r') as f:
+            self.assertEqual(len(f.readlines()), 11)
+
+        for step in range(15, 25):
+            exporter.add_step(step, self.emissions[step])
+        exporter.close()
+
+        with open(path, 'r') as f:
+            self.assertEqual(f.readline().strip(), 'Step,"Area (0,0)","Area (0,1)"')
+        rows = np.loadtxt(path, delimiter=',', skiprows=1)
+        self.assertEqual(rows[:, 0].tolist(), list(range(25)))
+        np.testing.assert_allclose(rows[:, 1:], self.emissions.sum(axis=2), atol=1e-3)
+
+    def test_npz_chunks(self):
+        path = os.path.join(self.dir.name, 'export')
+        exporter = NpzExporter(path, self.names, batch_size=10)
+        for step in range(25):
+            exporter.add_step(step, self.emissions[step])
+
+        names, steps, emissions = read_npz_export(path)
+        self.assertEqual(names, self.names)
+        self.assertEqual(steps.tolist(), list(range(20)))
+
+        exporter.close()
+        names, steps, emissions = read_npz_export(path)
+        self.assertEqual(steps.tolist(), list(range(25)))
+        np.testing.assert_array_equal(emissions, self.emissions)
+
+    def test_write_batch_required(self):
+        class IncompleteExporter(Exporter):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteExporter(os.path.join(self.dir.name, 'export'), self.names)
+
+
+if __name__ == '__main__':
+    unittest.main()
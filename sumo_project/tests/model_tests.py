@@ -0,0 +1,76 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+import data
+from model import EmissionVector, Phase
+
+
+class EmissionVectorTests(unittest.TestCase):
+    def test_add(self):
+        total = EmissionVector(1, 2, 3, 4, 5) + EmissionVector(10, 20, 30, 40, 50)
+        self.assertEqual(total.values.tolist(), [11, 22, 33, 44, 55])
+
+    def test_iadd_in_place(self):
+        total = EmissionVector()
+        values = total.values
+        total += EmissionVector(1, 2, 3, 4, 5)
+        self.assertIs(total.values, values)
+        self.assertEqual(total.value(), 15)
+
+    def test_sum(self):
+        total = EmissionVector.sum([EmissionVector(1, 1, 1, 1, 1)] * 4)
+        self.assertEqual(total.values.tolist(), [4] * 5)
+        self.assertEqual(EmissionVector.sum([]).value(), 0)
+
+    def test_pollutants(self):
+        emission = EmissionVector.from_array(np.arange(5))
+        self.assertEqual((emission.co2, emission.co, emission.nox, emission.hc, emission.pmx), (0, 1, 2, 3, 4))
+        self.assertEqual(emission['nox'], 2)
+
+
+class PhaseTests(unittest.TestCase):
+    def test_from_sumo_public_fields(self):
+        phase = Phase.from_sumo(SimpleNamespace(duration=30, minDur=10, maxDur=40, state='GGrr'))
+        self.assertEqual((phase.duration, phase.minDuration, phase.maxDuration, phase.phaseDef), (30, 10, 40, 'GGrr'))
+
+    def test_from_sumo_private_fields(self):
+        # Fields of the SUMO 1.0 phases
+        phase = Phase.from_sumo(SimpleNamespace(_duration=30, _duration1=10, _duration2=40, _phaseDef='GGrr'))
+        self.assertEqual((phase.duration, phase.minDuration, phase.maxDuration, phase.phaseDef), (30, 10, 40, 'GGrr'))
+
+    def test_to_sumo_round_trip(self):
+        phase = Phase.from_sumo(Phase(30, 10, 40, 'GGrr').to_sumo(duration_rf=0.5))
+        self.assertEqual((phase.duration, phase.minDuration, phase.maxDuration, phase.phaseDef), (15, 5, 20, 'GGrr'))
+
+
+class TrafficLightsTests(unittest.TestCase):
+    def setUp(self):
+        logic = SimpleNamespace(getPhases=lambda: [SimpleNamespace(duration=30, minDur=10, maxDur=40, state='Gr'),
+                                                   SimpleNamespace(duration=3, minDur=3, maxDur=3, state='yr')])
+        controlled_lanes = {'tl0': ['a_0', 'a_0', 'b_0'], 'tl1': ['b_0']}
+        trafficlight = SimpleNamespace(getIDList=lambda: ['tl0', 'tl1'],
+                                       getControlledLanes=controlled_lanes.__getitem__,
+                                       getCompleteRedYellowGreenDefinition=lambda tl_id: [logic])
+        self.traci = mock.patch.object(data, 'traci', SimpleNamespace(trafficlight=trafficlight))
+        self.traci.start()
+        self.data = data.Data('test_dump', ((0, 0), (1000, 600)), 2, '/test_simulation')
+
+    def tearDown(self):
+        self.traci.stop()
+
+    def test_get_traffic_light(self):
+        tl = self.data.get_traffic_light('tl0')
+        self.assertEqual(tl.tl_id, 'tl0')
+        self.assertEqual(len(tl._logics), 1)
+        self.assertEqual([(phase.duration, phase.phaseDef) for phase in tl._logics[0]._phases],
+                         [(30, 'Gr'), (3, 'yr')])
+
+    def test_get_controlling_traffic_lights(self):
+        self.assertEqual(self.data.get_controlling_traffic_lights(), {'a_0': ['tl0'], 'b_0': ['tl0', 'tl1']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import emissions
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from benchmarks.run_benchmarks import create_data, create_process
+from pipeline import StepPipeline, fetch_step
+from registry import VehicleRegistry
+
+
+class StepPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.network = synthetic_network(200, 10, ((0, 0), (1000, 1000)))
+        self.data = create_data(self.network, 4, self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def create_process(self, n_steps):
+        p = create_process(self.data, n_steps, window_size=5)
+        p.config.lane_aggregation_mode = False
+        p.config.control_period = 2
+        p.registry = VehicleRegistry()
+        p.exporter = None
+        return p
+
+    def test_same_emissions_as_serial_loop(self):
+        n_steps = 20
+        serial = self.create_process(n_steps)
+        with plug(FakeTraci(self.network, 50)) as fake:
+            for step in range(n_steps):
+                fake.simulationStep()
+                serial.registry.update()
+                emissions.get_emissions(serial, serial.registry.sum_by_area(self.data), step)
+
+        pipelined = self.create_process(n_steps)
+        pipeline = StepPipeline(pipelined)
+        pipeline.start()
+        evaluated = []
+        with plug(FakeTraci(self.network, 50)) as fake:
+            for step in range(n_steps):
+                fake.simulationStep()
+                pipeline.submit(step, fetch_step(pipelined))
+                if pipeline.pending > 1:
+                    evaluated.append(pipeline.result() is not None)
+            while pipeline.pending:
+                evaluated.append(pipeline.result() is not None)
+        pipeline.stop()
+
+        np.testing.assert_allclose(pipelined.store.emissions, serial.store.emissions)
+        self.assertEqual(set(pipelined.registry.slots), set(serial.registry.slots))
+        self.assertEqual(evaluated, [(step + 1) % 2 == 0 for step in range(n_steps)])
+
+    def test_worker_error_is_raised(self):
+        p = self.create_process(1)
+        pipeline = StepPipeline(p)
+        pipeline.start()
+        pipeline.submit(0, None)
+        with self.assertRaises(TypeError):
+            pipeline.result()
+        pipeline.stop()
+        self.assertFalse(pipeline.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
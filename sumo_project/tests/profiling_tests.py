@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from profiling import PHASES, PhaseTimer, SamplingProfiler
+
+
+def busy_wait(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+class PhaseTimerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_laps(self):
+        timer = PhaseTimer(10, ('slow', 'fast'))
+        for step in range(2, 6):
+            timer.start(step)
+            busy_wait(0.002)
+            timer.lap('slow')
+            timer.lap('fast')
+
+        self.assertEqual(timer.durations[:2].sum(), 0)
+        self.assertTrue((timer.durations[2:6, 0] >= 0.002).all())
+        summary = timer.summary(2, 6)
+        self.assertEqual(summary['steps'], 4)
+        self.assertGreater(summary['phases']['slow']['share'], 90)
+        self.assertEqual(sum(summary['phases']['slow']['histogram']), 4)
+
+    def test_save(self):
+        timer = PhaseTimer(5)
+        for step in range(5):
+            timer.start(step)
+            for phase in PHASES:
+                timer.lap(phase)
+
+        path = os.path.join(self.dir.name, 'run.profile')
+        timer.save(path, 0, 5)
+        with open(f'{path}.json', 'r') as f:
+            self.assertEqual(list(json.load(f)['phases']), list(PHASES))
+        rows = np.loadtxt(f'{path}.csv', delimiter=',', skiprows=1)
+        self.assertEqual(rows.shape, (5, len(PHASES) + 1))
+        np.testing.assert_allclose(rows[:, 1:], timer.durations, atol=1e-9)
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    def test_samples_thread(self):
+        profiler = SamplingProfiler(threading.get_ident(), interval=0.001)
+        profiler.start()
+        busy_wait(0.2)
+        profiler.stop()
+
+        self.assertTrue(any('busy_wait' in stack for stack in profiler.stacks))
+        functions = [function for function, _ in profiler.top_functions()]
+        self.assertIn('profiling_tests.py:busy_wait', functions)
+
+
+if __name__ == '__main__':
+    unittest.main()
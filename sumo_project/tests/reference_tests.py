@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from data import Data
+from reference import ReferenceCache, add_reductions, get_simulation_files, reference_key
+from scheduler import Job
+from store import EmissionStore
+
+SUMOCFG = """<configuration>
+    <input>
+        <net-file value="test.net.xml"/>
+        <route-files value="a.trips.xml,b.trips.xml"/>
+    </input>
+</configuration>
+"""
+
+
+class ReferenceTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.sumocfg = os.path.join(self.dir.name, 'test.sumocfg')
+        with open(self.sumocfg, 'w') as f:
+            f.write(SUMOCFG)
+        for name in ['test.net.xml', 'a.trips.xml', 'b.trips.xml']:
+            with open(os.path.join(self.dir.name, name), 'w') as f:
+                f.write(name)
+
+        self.data = Data('test_dump', ((0, 0), (1000, 600)), 2, self.dir.name)
+        self.data.init_grid()
+        self.config = SimpleNamespace(_SUMOCFG=self.sumocfg, n_steps=100, window_size=10, seed=None,
+                                      lane_aggregation_mode=False)
+        self.cache = ReferenceCache(os.path.join(self.dir.name, 'references'))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_simulation_files(self):
+        files = [os.path.basename(path) for path in get_simulation_files(self.sumocfg)]
+        self.assertEqual(files, ['test.sumocfg', 'test.net.xml', 'a.trips.xml', 'b.trips.xml'])
+
+    def test_key_depends_on_inputs(self):
+        key = reference_key(self.data, self.config)
+        self.assertEqual(reference_key(self.data, self.config), key)
+
+        self.config.n_steps = 200
+        self.assertNotEqual(reference_key(self.data, self.config), key)
+        self.config.n_steps = 100
+
+        with open(os.path.join(self.dir.name, 'b.trips.xml'), 'w') as f:
+            f.write('other routes')
+        self.assertNotEqual(reference_key(self.data, self.config), key)
+
+    def test_cache_and_reductions(self):
+        key = reference_key(self.data, self.config)
+        self.assertIsNone(self.cache.load(key))
+
+        store = EmissionStore(100, len(self.data.grid))
+        store.emissions[:] = 1
+        self.cache.save(key, store)
+        np.testing.assert_array_equal(self.cache.load(key), store.emissions)
+
+        job = Job(0, 'config.json')
+        job.status = 'done'
+        job.result = {'total': store.emissions.sum() * 0.75, 'reference': False, 'reference_key': key}
+        add_reductions([job], self.cache)
+        self.assertAlmostEqual(job.result['reduction'], 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.fake_traci import FakeTraci, plug, synthetic_network
+from benchmarks.run_benchmarks import create_data
+from registry import VehicleRegistry
+
+
+class VehicleRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.network = synthetic_network(200, 10, ((0, 0), (1000, 1000)))
+        self.data = create_data(self.network, 4, self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_steps(self, subscription_mode, n_steps=10):
+        with plug(FakeTraci(self.network, 50, churn=0.1)) as fake:
+            registry = VehicleRegistry(subscription_mode)
+            areas_emissions = []
+            for _ in range(n_steps):
+                fake.simulationStep()
+                registry.update()
+                areas_emissions.append(registry.sum_by_area(self.data))
+        return fake, np.array(areas_emissions)
+
+    def test_subscription_and_polling_give_same_totals(self):
+        subscription_fake, subscription_emissions = self.run_steps(subscription_mode=True)
+        polling_fake, polling_emissions = self.run_steps(subscription_mode=False)
+
+        np.testing.assert_allclose(subscription_emissions, polling_emissions)
+        self.assertGreater(subscription_emissions.sum(), 0)
+        self.assertEqual(len(subscription_fake.subscribed), 50)
+        self.assertEqual(len(polling_fake.subscribed), 0)
+
+    def test_slots_reused_after_arrivals(self):
+        registry = VehicleRegistry(capacity=4)
+        for veh_id in ('a', 'b', 'c'):
+            registry._add(veh_id, 'passenger', 'HBEFA3/PC_G_EU4')
+        slot = registry.slots['b']
+        registry.emissions[slot] = 1.0
+        registry.unregister('b')
+
+        self.assertFalse(registry.alive[slot])
+        self.assertEqual(registry.emissions[slot].sum(), 0)
+        registry._add('d', 'bus', 'HBEFA3/Bus')
+        self.assertEqual(registry.slots['d'], slot)
+        self.assertEqual(registry.emission_classes[slot], 'HBEFA3/Bus')
+
+    def test_grow(self):
+        registry = VehicleRegistry(capacity=2)
+        for index in range(5):
+            registry._add(f'veh{index}', 'passenger', 'HBEFA3/PC_G_EU4')
+
+        self.assertEqual(len(registry.alive), 8)
+        self.assertEqual(registry.positions.shape, (8, 2))
+        self.assertEqual(len(registry.emission_classes), 8)
+        self.assertEqual(sorted(registry.slots.values()), list(range(5)))
+        self.assertEqual(int(registry.alive.sum()), 5)
+
+    def test_classes_total(self):
+        registry = VehicleRegistry()
+        self.assertEqual(registry.classes_total(), {})
+        registry.apply(([], [('car', 'passenger', None), ('bus', 'bus', None)], {}))
+        registry.positions[registry.slots['car']] = (10, 10)
+        registry.positions[registry.slots['bus']] = (900, 900)
+        registry.emissions[registry.slots['car']] = (1, 2, 3, 4, 5)
+        registry.emissions[registry.slots['bus']] = (10, 20, 30, 40, 50)
+        registry.sum_by_area(self.data)
+        registry.sum_by_area(self.data)
+
+        totals = registry.classes_total()
+        self.assertEqual(list(totals), ['passenger', 'bus'])
+        self.assertEqual(totals['passenger'].value(), 30)
+        self.assertEqual(totals['bus'].value(), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import unittest
+
+from scheduler import Scheduler, exit_on_terminate
+
+
+class FakeProcess(multiprocessing.Process):
+    """
+    Process behaving as described by its configuration file name : ok, fail, hang, flaky (failing once),
+    cleanup (hanging, then sending a partial result when terminated) or stubborn (ignoring SIGTERM)
+    """
+
+    def __init__(self, config_file, result_queue, running):
+        multiprocessing.Process.__init__(self)
+        self.config_file = config_file
+        self.result_queue = result_queue
+        self.running = running
+
+    def run(self):
+        with self.running.get_lock():
+            self.running.value += 1
+        try:
+            behavior = os.path.basename(self.config_file)
+            if behavior == 'cleanup':
+                exit_on_terminate()
+                try:
+                    time.sleep(60)
+                finally:
+                    self.result_queue.put({'name': self.name, 'completed': False, 'total': 1.0,
+                                           'real_time_factor': None})
+            if behavior == 'stubborn':
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            if behavior in ('hang', 'stubborn'):
+                time.sleep(60)
+            if behavior == 'fail':
+                raise SystemExit(1)
+            if behavior == 'flaky' and not os.path.exists(self.config_file):
+                open(self.config_file, 'w').close()
+                raise SystemExit(1)
+            time.sleep(0.2)
+            self.result_queue.put({'name': self.name, 'completed': True, 'total': 42.0, 'real_time_factor': 10.0})
+        finally:
+            with self.running.get_lock():
+                self.running.value -= 1
+
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.running = multiprocessing.Value('i', 0)
+        self.max_running = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def create_process(self, config_file, result_queue):
+        self.max_running = max(self.max_running, self.running.value)
+        return FakeProcess(os.path.join(self.dir.name, config_file), result_queue, self.running)
+
+    def test_bounded_workers(self):
+        jobs = Scheduler(workers=2, poll_interval=0.05).run(['ok'] * 6, self.create_process)
+        self.assertEqual([job.status for job in jobs], ['done'] * 6)
+        self.assertEqual([job.result['total'] for job in jobs], [42.0] * 6)
+        self.assertLessEqual(self.max_running, 2)
+
+    def test_retries(self):
+        jobs = Scheduler(workers=2, retries=1, poll_interval=0.05).run(['flaky', 'fail'], self.create_process)
+        self.assertEqual([(job.status, job.attempts) for job in jobs], [('done', 2), ('failed', 2)])
+
+    def test_timeout(self):
+        start = time.perf_counter()
+        jobs = Scheduler(workers=2, timeout=0.5, poll_interval=0.05).run(['hang', 'ok'], self.create_process)
+        self.assertEqual([job.status for job in jobs], ['timeout', 'done'])
+        self.assertIsNone(jobs[0].result)
+        self.assertLess(time.perf_counter() - start, 10)
+
+    def test_terminated_process_cleans_up(self):
+        jobs = Scheduler(workers=1, timeout=0.5, poll_interval=0.05).run(['cleanup'], self.create_process)
+        self.assertEqual(jobs[0].status, 'timeout')
+        self.assertEqual(jobs[0].result['completed'], False)
+        self.assertEqual(jobs[0].result['total'], 1.0)
+
+    def test_stubborn_process_killed(self):
+        start = time.perf_counter()
+        jobs = Scheduler(workers=1, timeout=0.5, poll_interval=0.05, grace_period=0.5).run(['stubborn'],
+                                                                                          self.create_process)
+        self.assertEqual(jobs[0].status, 'timeout')
+        self.assertLess(time.perf_counter() - start, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from model import Area
+from store import EmissionStore
+
+
+class EmissionStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(42)
+        self.emissions = rng.uniform(0, 1000, size=(10, 3, 5))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def fill(self, store):
+        for step, areas_emissions in enumerate(self.emissions):
+            store.add_step(step, areas_emissions)
+
+    def check_sums(self, store):
+        self.assertEqual((store.n_steps, store.n_areas), (10, 3))
+        np.testing.assert_allclose(store.area_emissions(1), self.emissions[:, 1, :])
+        np.testing.assert_allclose(store.values(4), self.emissions[4].sum(axis=1))
+        np.testing.assert_allclose(store.total(), self.emissions.sum(axis=(0, 1)))
+
+    def test_in_memory(self):
+        store = EmissionStore(10, 3)
+        self.assertEqual(store.total().tolist(), [0] * 5)
+        self.fill(store)
+        self.check_sums(store)
+
+    def test_mmap(self):
+        filename = os.path.join(self.dir.name, 'store.npy')
+        store = EmissionStore(10, 3, filename)
+        self.assertIsInstance(store.emissions, np.memmap)
+        self.fill(store)
+        self.check_sums(store)
+        store.flush()
+        del store
+
+        np.testing.assert_array_equal(np.load(filename), self.emissions)
+
+    def test_area_bound_to_store(self):
+        area = Area(((0, 0), (0, 10), (10, 10), (10, 0)), 'Area (0,0)')
+        self.assertEqual(area.sum_all_emissions().value(), 0)
+
+        store = EmissionStore(10, 3)
+        self.fill(store)
+        area.set_emissions_store(store, 2)
+        self.assertAlmostEqual(area.sum_all_emissions().value(), self.emissions[:, 2, :].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
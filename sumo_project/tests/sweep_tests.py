@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+
+from scheduler import Job
+from sweep import Sweep
+
+
+class FakeData:
+    def __init__(self, simulation_dir):
+        self.dir = simulation_dir
+
+
+class FakeScheduler:
+    """
+    Scheduler computing the total emissions of a configuration without running it :
+    the reference emits 1000 mg per step and the emissions decrease with the threshold
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def run(self, config_files, create_process):
+        jobs = []
+        for index, config_file in enumerate(config_files):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+            self.runs.append((os.path.basename(config_file), config['n_steps']))
+
+            job = Job(index, config_file)
+            job.status = 'done'
+            per_step = 1000 if config['without_actions_mode'] else 1000 - config['emissions_threshold'] / 1000
+            job.result = {'completed': True, 'total': per_step * config['n_steps'], 'real_time_factor': None}
+            jobs.append(job)
+        return jobs
+
+
+class SweepTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        base_config = os.path.join(self.dir.name, 'base.json')
+        with open(base_config, 'w') as f:
+            json.dump({'n_steps': 400, 'without_actions_mode': False, 'emissions_threshold': 0}, f)
+        sweep_file = os.path.join(self.dir.name, 'sweep.json')
+        with open(sweep_file, 'w') as f:
+            json.dump({'parameters': {'emissions_threshold': [100000, 200000, 300000, 400000]},
+                       'min_steps': 100}, f)
+        self.sweep = Sweep(FakeData(self.dir.name), base_config, sweep_file)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_rungs(self):
+        self.assertEqual(self.sweep.rungs(), [100, 200, 400])
+
+    def test_successive_halving(self):
+        scheduler = FakeScheduler()
+        ranking = self.sweep.run(scheduler, None)
+
+        self.assertEqual([candidate['parameters']['emissions_threshold'] for candidate in ranking], [400000])
+        self.assertAlmostEqual(ranking[0]['reductions'][400], 40)
+        # The reference is run at each rung with the survivors only
+        self.assertEqual([n_steps for _, n_steps in scheduler.runs], [100] * 5 + [200] * 3 + [400] * 2)
+        with open(os.path.join(self.sweep.dir, 'results.json'), 'r') as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from config import Config
+from data import Data
+from netfile import NetFile
+from runner import RunProcess, main, run_warmup
+from scheduler import Scheduler
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'files', 'simulations', 'mulhouse_simulation')
+SIMULATION_FILES = ['osm.sumocfg', 'osm.net.xml', 'osm.passenger.trips.xml', 'osm.poly.xml', 'osm.view.xml']
+
+
+class WarmupTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name in SIMULATION_FILES:
+            shutil.copy(os.path.join(SIMULATION_DIR, name), self.dir.name)
+
+        network = NetFile(os.path.join(self.dir.name, 'osm.net.xml')).read()
+        self.data = Data('warmup', network.map_bounds, 2, self.dir.name)
+        self.data.init_grid()
+        self.data.add_net_data_to_areas(network)
+        self.dump_path = self.data.save()
+        self.config_file = self.write_config('config')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_config(self, name, **options):
+        config = {'_SUMOCMD': 'sumo', 'n_steps': 60, 'window_size': 20, 'without_actions_mode': False,
+                  'limit_speed_mode': True, 'speed_rf': 0.1, 'adjust_traffic_light_mode': False,
+                  'trafficLights_duration_rf': 0.2, 'weight_routing_mode': False, 'lock_area_mode': False,
+                  'emissions_threshold': 20000, **options}
+        path = os.path.join(self.dir.name, f'{name}.json')
+        with open(path, 'w') as f:
+            json.dump(config, f)
+        return path
+
+    def create_process_factory(self, snapshot_dir):
+        def create_process(conf, result_queue):
+            return RunProcess(None, Config(conf, self.data), False, False, result_queue, self.dump_path,
+                              snapshot_dir=snapshot_dir)
+        return create_process
+
+    def test_runs_start_after_warmup(self):
+        scheduler = Scheduler(workers=1, timeout=300)
+        snapshot_dir = run_warmup(self.data, [self.config_file], 30, scheduler, False, self.dump_path)
+        self.assertTrue(os.path.isfile(os.path.join(snapshot_dir, 'checkpoint.npz')))
+
+        job, = scheduler.run([self.config_file], self.create_process_factory(snapshot_dir))
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result['steps'], 60)
+        self.assertEqual(job.result['simulated_steps'], 30)
+
+    def test_traffic_lights_after_warmup(self):
+        config_files = [self.write_config(name, adjust_traffic_light_mode=adjust_traffic_light_mode,
+                                          emissions_threshold=1e12)
+                        for name, adjust_traffic_light_mode in (('tls', True), ('no_tls', False))]
+        scheduler = Scheduler(workers=1, timeout=300)
+        snapshot_dir = run_warmup(self.data, config_files, 30, scheduler, False, self.dump_path)
+
+        tls_job, no_tls_job = scheduler.run(config_files, self.create_process_factory(snapshot_dir))
+        # No area is adjusted, the traffic lights must continue their initial programs after the warm-up
+        self.assertEqual(tls_job.status, 'done')
+        self.assertEqual(no_tls_job.status, 'done')
+        self.assertGreater(tls_job.result['total'], 0)
+        self.assertEqual(tls_job.result['pollutants'], no_tls_job.result['pollutants'])
+
+    def test_warmup_longer_than_runs(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertIsNone(run_warmup(self.data, [self.config_file], 60, Scheduler(workers=1), False))
+        self.assertIn('must be greater than the 60 warm-up steps', out.getvalue())
+
+    def test_failed_warmup_aborts(self):
+        failing_scheduler = SimpleNamespace(run=lambda files, create_process: [SimpleNamespace(status='failed')])
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertIsNone(run_warmup(self.data, [self.config_file], 30, failing_scheduler, False))
+        self.assertIn('The warm-up simulation failed', out.getvalue())
+
+        with mock.patch('runner.run_warmup', return_value=None), mock.patch.object(Scheduler, 'run') as run:
+            main(['-run', self.dump_path, '-c', self.config_file, '-warmup', '30'])
+        run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import collections
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+import window
+
+
+class SlidingWindowTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.steps = rng.uniform(0, 100, size=(50, 3, 5))
+
+    def assert_matches_deques(self, sizes):
+        sliding_window = window.SlidingWindow(3, sizes)
+        deques = [collections.deque(maxlen=size) for size in sizes]
+        for step in self.steps:
+            actual = sliding_window.add(step)
+            for pollutant, deque in enumerate(deques):
+                deque.append(step[:, pollutant])
+            expected = sum(np.sum(deque, axis=0) for deque in deques)
+            np.testing.assert_allclose(actual, expected)
+
+    def test_same_size_for_all_pollutants(self):
+        self.assert_matches_deques([7] * 5)
+
+    def test_size_per_pollutant(self):
+        self.assert_matches_deques([1, 4, 7, 7, 12])
+
+
+class ExponentialWindowTests(unittest.TestCase):
+    def test_decay(self):
+        exponential_window = window.ExponentialWindow(2, [10] * 5)
+        emissions = np.ones((2, 5))
+        exponential_window.add(emissions)
+        actual = exponential_window.add(emissions)
+        np.testing.assert_allclose(actual, 5 * (1 + np.exp(-1 / 10)))
+
+
+class CreateWindowTests(unittest.TestCase):
+    def test_create_window(self):
+        config = SimpleNamespace(window_type='exponential', window_size=30, pollutants_window_size={'co2': 60})
+        created = window.create_window(config, 4)
+        self.assertIsInstance(created, window.ExponentialWindow)
+        self.assertEqual(created.sizes.tolist(), [60, 30, 30, 30, 30])
+
+    def test_unknown_window_type(self):
+        config = SimpleNamespace(window_type='unknown', window_size=30, pollutants_window_size=None)
+        self.assertRaises(ValueError, window.create_window, config, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
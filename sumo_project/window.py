@@ -0,0 +1,112 @@
+"""
+This module defines the acquisition windows in which the emissions of the areas are summed
+"""
+
+import numpy as np
+
+from model import POLLUTANTS
+
+
+class SlidingWindow:
+    """
+    The SlidingWindow class sums the emissions of the last steps for all areas at once.
+    Each pollutant can have its own window size.
+    Running sums are updated in O(1) per area and pollutant at each step.
+    """
+
+    def __init__(self, n_areas: int, sizes):
+        """
+        SlidingWindow constructor
+        :param n_areas: The number of areas
+        :param sizes: The window size (in steps) of each pollutant
+        """
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self._pollutants = np.arange(len(POLLUTANTS))
+        self._buffer = np.zeros((self.sizes.max(), n_areas, len(POLLUTANTS)))
+        self._sums = np.zeros((n_areas, len(POLLUTANTS)))
+        self._steps = 0
+
+    def add(self, areas_emissions):
+        """
+        Add the emissions of a new step into the window
+        :param areas_emissions: The array of emissions with shape (areas, pollutants)
+        :return: The sum of all pollutant emissions (in mg) into the window for each area
+        """
+        capacity = len(self._buffer)
+        index = self._steps % capacity
+
+        # Emissions leaving the window of each pollutant, read before being overwritten
+        leaving = self._buffer[(self._steps - self.sizes) % capacity, :, self._pollutants]
+        leaving[self._steps < self.sizes] = 0
+
+        self._buffer[index] = areas_emissions
+        self._sums += areas_emissions
+        self._sums -= leaving.T
+        self._steps += 1
+
+        # Periodic exact sum to avoid the drift of the running sums
+        if index == capacity - 1:
+            self._resync()
+
+        return self._sums.sum(axis=1)
+
+    def _resync(self):
+        """
+        Compute again the running sums from the buffer
+        """
+        capacity = len(self._buffer)
+        for size in np.unique(self.sizes):
+            rows = np.arange(self._steps - min(size, self._steps), self._steps) % capacity
+            pollutants = self.sizes == size
+            self._sums[:, pollutants] = self._buffer[rows][:, :, pollutants].sum(axis=0)
+
+
+class ExponentialWindow:
+    """
+    The ExponentialWindow class sums the emissions of all areas with an exponential decay,
+    the time constant (in steps) of each pollutant being its window size
+    """
+
+    def __init__(self, n_areas: int, sizes):
+        """
+        ExponentialWindow constructor
+        :param n_areas: The number of areas
+        :param sizes: The window size (in steps) of each pollutant
+        """
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self._decay = np.exp(-1 / self.sizes)
+        self._sums = np.zeros((n_areas, len(POLLUTANTS)))
+
+    def add(self, areas_emissions):
+        """
+        Add the emissions of a new step into the window
+        :param areas_emissions: The array of emissions with shape (areas, pollutants)
+        :return: The decayed sum of all pollutant emissions (in mg) for each area
+        """
+        self._sums *= self._decay
+        self._sums += areas_emissions
+        return self._sums.sum(axis=1)
+
+
+"""
+Available acquisition windows, selectable with the window_type option of the configuration file
+"""
+WINDOW_TYPES = {
+    'sliding': SlidingWindow,
+    'exponential': ExponentialWindow
+}
+
+
+def create_window(config, n_areas):
+    """
+    Create the acquisition window chosen by the user
+    :param config: The Config instance
+    :param n_areas: The number of areas
+    :return: A new window instance
+    """
+    if config.window_type not in WINDOW_TYPES:
+        raise ValueError(f'Unknown window type {config.window_type}, available types : {", ".join(WINDOW_TYPES)}')
+
+    pollutants_window_size = config.pollutants_window_size or {}
+    sizes = [pollutants_window_size.get(pollutant, config.window_size) for pollutant in POLLUTANTS]
+    return WINDOW_TYPES[config.window_type](n_areas, sizes)